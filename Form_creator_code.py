@@ -1,183 +1,2012 @@
 import os
+import sys
+import csv
 import pickle
-import json # For potential debugging
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+import argparse
+import contextlib
+import functools
+import hashlib
+import datetime
+import bisect
+import collections
+import heapq
+import itertools
+import unicodedata
+import random
+import threading
+import time
+import json # For potential debugging and JSONL imports
+# Only the light errors module is imported up front. google-auth, oauthlib and the
+# discovery client are imported inside the functions that need them, which keeps
+# startup fast (noticeably so on Termux).
 from googleapiclient.errors import HttpError
 
 # Global Constants
 SCOPES = ['https://www.googleapis.com/auth/forms.body']
-TOKEN_PICKLE_FILE = 'token.pickle'
+RESPONSES_SCOPE = 'https://www.googleapis.com/auth/forms.responses.readonly' # Added by quiz_results.py
+TOKEN_JSON_FILE = 'token.json'
+TOKEN_PICKLE_FILE = 'token.pickle' # Older token format, migrated to TOKEN_JSON_FILE on first run
+TOKEN_REFRESH_MARGIN_SECONDS = 300 # Refresh this long before the access token expires
+TOKEN_REFRESH_RETRY_SECONDS = 5.0 # First background retry after a failed refresh, doubled on each failure
+TOKEN_REFRESH_RETRY_MAX_SECONDS = 3600.0
 CREDENTIALS_JSON_FILE = 'Web.Credentials.json' # Ensure this file exists
 
-def authenticate():
-    """Handles Google OAuth 2.0 authentication."""
-    print("Authenticating...")
-    creds = None
-    if os.path.exists(TOKEN_PICKLE_FILE):
-        with open(TOKEN_PICKLE_FILE, 'rb') as token:
-            try:
-                creds = pickle.load(token)
-            except (pickle.UnpicklingError, EOFError, AttributeError, ImportError, IndexError) as e:
-                print(f"Error loading token from {TOKEN_PICKLE_FILE}. File might be corrupted or incompatible: {e}")
-                creds = None # Ensure creds is None if loading fails
+# Bulk import settings
+IMPORT_FORMATS = ('csv', 'jsonl', 'yaml')
+IMPORT_FIELDS = ('question', 'options', 'correct_index', 'points')
+CSV_OPTION_SEPARATOR = '|' # Options are packed into one CSV column, e.g. "Rome|Paris|Berlin"
 
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            try:
-                print("Refreshing expired credentials...")
-                creds.refresh(Request())
-            except Exception as e:
-                print(f"Error refreshing credentials: {e}")
-                creds = None
+# batchUpdate chunking limits
+MAX_ITEMS_PER_BATCH = 200 # createItem requests per batchUpdate call
+MAX_BATCH_BYTES = 512 * 1024 # Encoded JSON size of one batchUpdate body
+
+# Adaptive (AIMD) batchUpdate sizing; MAX_ITEMS_PER_BATCH is the starting size
+ADAPTIVE_MIN_ITEMS = 10
+ADAPTIVE_MAX_ITEMS = 1000
+ADAPTIVE_ITEMS_STEP = 20 # Additive increase after a fast, full chunk
+ADAPTIVE_DECREASE_FACTOR = 0.5 # Multiplicative decrease after a slow, retried or failed chunk
+ADAPTIVE_TARGET_SECONDS = 8.0 # A chunk taking longer than this is "slow"; well below HTTP_TIMEOUT_SECONDS
+ADAPTIVE_MIN_BYTES = 16 * 1024 # Floor of the byte limit after request-size errors
+ADAPTIVE_BYTES_STEP = 4 * 1024 # Additive recovery of the byte limit, never past a size that was rejected
+SIZE_ERROR_MARKERS = ('size exceeds', 'too large', 'too many requests') # 400 messages about oversized batches
+
+# Batch (manifest) mode settings
+DEFAULT_WORKERS = 4
+DEFAULT_WRITES_PER_MINUTE = 150 # Keep below the project's Forms API write quota per minute
+
+# Batch HTTP requests (--http-batch): many API calls in one multipart round trip
+HTTP_BATCH_MAX_CALLS = 50 # Well below the batch endpoint's limit; every call still counts against the quota
+HTTP_BATCH_MAX_BYTES = 8 * 1024 * 1024 # Combined bodies of one batch request
+
+# Sharding of large banks
+SHARD_MODES = ('forms', 'sections') # Separate forms created in parallel, or page-break sections of one form
+
+# Per-student randomized variants
+VARIANTS_FILE = 'variants.csv' # student -> variant -> form mapping
+
+# Retry settings for transient API errors
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+MAX_RETRIES_PER_CALL = 5
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 32.0
+RETRY_BUDGET_PER_FORM = 20 # Retries one form may use before its calls fail fast
+RETRY_BUDGET_PER_RUN = 200 # Retries the whole run may use
+
+# Resume journal for partially provisioned forms
+JOURNAL_FILE = 'form_journal.jsonl'
+
+# Cache of forms already created from identical inputs
+FORM_CACHE_FILE = 'form_cache.json'
+FORM_CACHE_TTL_DAYS = 30
+FORM_CACHE_MAX_ENTRIES = 1000 # Least recently used entries are evicted beyond this
+
+# Local copy of the Forms API discovery document
+DISCOVERY_CACHE_FILE = 'forms_v1_discovery.json'
+DISCOVERY_CACHE_FORMAT = 1 # Bump when the cache file layout changes
+DISCOVERY_CACHE_MAX_AGE_SECONDS = 7 * 24 * 3600
+offline_mode = False # When True, always build from the cached (or bundled) document
+
+# HTTP transport shared by worker threads
+HTTP_TRANSPORTS = ('pooled', 'httplib2')
+HTTP_TIMEOUT_SECONDS = 60
+
+# Compiled request plans (--compile / --replay)
+PLAN_FORMAT = 1 # Bump when the plan file layout changes
+
+# Daemon mode (--serve / --socket)
+DAEMON_DEFAULT_ADDRESS = '127.0.0.1:8780' # Local only; put a reverse proxy in front for remote callers
+DAEMON_MAX_QUEUED_JOBS = 1000 # Submissions beyond this are answered with HTTP 503 until the queue drains
+DAEMON_MAX_JOB_BYTES = 16 * 1024 * 1024 # Largest accepted job body
+DAEMON_JOB_HISTORY = 10000 # Finished jobs kept for status queries
+DAEMON_LATENCY_SAMPLES = 10000 # Most recent jobs used for the latency percentiles
+DAEMON_CALLBACK_TIMEOUT_SECONDS = 10
+DAEMON_RETRY_WINDOW_SECONDS = 3600 # The daemon allows RETRY_BUDGET_PER_RUN retries per this rolling window
+
+# Run metrics and profiling
+PROFILE_MODES = ('cpu', 'memory')
+PROFILE_TOP_ENTRIES = 20 # Lines of profiler output shown for this script
+
+class RunMetrics:
+    """
+    Collects timing events for every API call and pipeline stage. Each event is
+    appended to a JSON lines file as it happens (if a path is given), and
+    summary_rows() aggregates them per stage and per API method.
+    """
+    def __init__(self, path=None):
+        self.path = path
+        self.events = []
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.out_file = open(path, 'a', encoding='utf-8') if path else None
+
+    def record(self, event, **fields):
+        entry = {"event": event, "at": round(time.perf_counter() - self.started, 4),
+                 "thread": threading.current_thread().name}
+        entry.update(fields)
+        with self.lock:
+            self.events.append(entry)
+            if self.out_file:
+                self.out_file.write(json.dumps(entry) + '\n')
+                self.out_file.flush()
+
+    def record_call(self, api_request, seconds, waited, retries, error=None, result=None):
+        """Records one _execute() call; response size is measured by re-encoding the result."""
+        if error is None:
+            outcome = "ok"
+        elif isinstance(error, HttpError):
+            outcome = f"http_{getattr(error.resp, 'status', 'error')}"
         else:
-            if not os.path.exists(CREDENTIALS_JSON_FILE):
-                print(f"Error: Credentials file '{CREDENTIALS_JSON_FILE}' not found.")
-                print("Please download your OAuth 2.0 client secrets file from Google Cloud Console,")
-                print(f"name it '{CREDENTIALS_JSON_FILE}', and place it in the same directory as this script.")
-                return None
+            outcome = type(error).__name__
+        body = getattr(api_request, 'body', None)
+        self.record("call", method=getattr(api_request, 'methodId', None) or type(api_request).__name__,
+                    stage=getattr(_metrics_state, 'stage', None), ms=round(seconds * 1000, 2),
+                    wait_ms=round(waited * 1000, 2), request_bytes=len(body) if body else 0,
+                    response_bytes=len(json.dumps(result)) if result is not None else 0,
+                    retries=retries, outcome=outcome)
+
+    def summary_rows(self):
+        """Returns one dict per stage and per API method with counts, latency percentiles and bytes."""
+        groups = collections.OrderedDict()
+        with self.lock:
+            events = list(self.events)
+        for event in events:
+            if event["event"] == "stage":
+                key = f"stage {event['stage']}"
+            elif event["event"] == "call":
+                key = f"call {event['method']}"
+            else:
+                continue
+            groups.setdefault(key, []).append(event)
+        rows = []
+        for key, group in groups.items():
+            latencies = sorted(event["ms"] for event in group)
+            rows.append({"name": key, "count": len(group), "total_s": round(sum(latencies) / 1000, 3),
+                         "p50_ms": latencies[len(latencies) // 2],
+                         "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+                         "sent_kib": round(sum(event.get("request_bytes", 0) for event in group) / 1024, 1),
+                         "received_kib": round(sum(event.get("response_bytes", 0) for event in group) / 1024, 1),
+                         "retries": sum(event.get("retries", 0) for event in group),
+                         "failed": sum(1 for event in group if event["outcome"] != "ok")})
+        return rows
+
+    def finish(self, print_summary=False):
+        """Records the run totals (retries, token refreshes), prints the table if asked and closes the file."""
+        self.record("summary", wall_s=round(time.perf_counter() - self.started, 3), retry_stats=dict(retry_stats),
+                    credential_stats=dict(credential_manager.stats) if credential_manager else None)
+        if print_summary:
+            print("\n--- Run metrics ---")
+            print(f"{'name':<34}{'count':>6}{'total s':>9}{'p50 ms':>9}{'p99 ms':>9}"
+                  f"{'sent KiB':>10}{'recv KiB':>10}{'retries':>8}{'failed':>7}")
+            for row in self.summary_rows():
+                print(f"{row['name']:<34}{row['count']:>6}{row['total_s']:>9}{row['p50_ms']:>9}{row['p99_ms']:>9}"
+                      f"{row['sent_kib']:>10}{row['received_kib']:>10}{row['retries']:>8}{row['failed']:>7}")
+            print(_retry_summary())
+            if credential_manager:
+                print(credential_manager.summary())
+        if self.out_file:
+            self.out_file.close()
+            self.out_file = None
+            print(f"Metrics written to {self.path}")
+
+run_metrics = None # RunMetrics instance when --metrics/--metrics-summary is given
+_metrics_state = threading.local() # Innermost stage of the current thread, used to tag API calls
+
+@contextlib.contextmanager
+def _stage(name, **fields):
+    """
+    Times a pipeline stage when metrics are enabled and tags the API calls made
+    inside it. The yielded dict may set "outcome"; an exception marks the stage
+    with the exception's name.
+    """
+    if run_metrics is None:
+        yield {}
+        return
+    outer_stage = getattr(_metrics_state, 'stage', None)
+    _metrics_state.stage = name
+    stage = {"outcome": "ok"}
+    started = time.perf_counter()
+    try:
+        yield stage
+    except BaseException as e:
+        stage["outcome"] = type(e).__name__
+        raise
+    finally:
+        _metrics_state.stage = outer_stage
+        run_metrics.record("stage", stage=name, ms=round((time.perf_counter() - started) * 1000, 2),
+                           outcome=stage["outcome"], **fields)
+
+def _timed_stage(name, succeeded=lambda result: result is not None):
+    """Decorator recording each call of a function as a _stage; succeeded(result) decides its outcome."""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with _stage(name) as stage:
+                result = function(*args, **kwargs)
+                if not succeeded(result):
+                    stage["outcome"] = "failed"
+                return result
+        return wrapper
+    return decorator
+
+def _run_profiled(mode, function):
+    """
+    Runs function() under cProfile ('cpu') or tracemalloc ('memory') and prints
+    the entries from this script, which covers the local payload building
+    (validation, encoding, chunking); network waits show up only as totals.
+    """
+    if mode is None:
+        return function()
+    if mode == 'cpu':
+        import cProfile
+        import pstats
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(function)
+        finally:
+            print("\n--- CPU profile (this script, by own time) ---")
+            pstats.Stats(profiler).sort_stats('tottime').print_stats(os.path.basename(__file__), PROFILE_TOP_ENTRIES)
+    import tracemalloc
+    tracemalloc.start()
+    try:
+        return function()
+    finally:
+        snapshot = tracemalloc.take_snapshot()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"\n--- Memory profile: peak {peak / 2**20:.2f} MiB traced; top allocations in this script ---")
+        snapshot = snapshot.filter_traces([tracemalloc.Filter(True, os.path.abspath(__file__))])
+        for statistic in snapshot.statistics('lineno')[:PROFILE_TOP_ENTRIES]:
+            print(statistic)
+
+class CredentialManager:
+    """
+    Loads the OAuth credentials once and shares them between worker threads.
+    Tokens are stored as JSON (TOKEN_JSON_FILE) rather than pickled; an old
+    token.pickle is migrated on first use. Refreshes happen before expiry
+    (optionally from a background timer) under a lock, so many workers asking
+    at once cause a single call to the token endpoint. Processes sharing the
+    token file take an exclusive file lock while refreshing and reuse a token
+    another process has just refreshed. After a failed refresh, no other is
+    tried for a backoff that doubles on each failure. HTTP transports get
+    transport_credentials(), whose refreshes also go through this manager.
+    """
+    def __init__(self, token_path=TOKEN_JSON_FILE, scopes=None):
+        self.token_path = token_path
+        self.scopes = scopes or SCOPES
+        self.creds = None
+        self.lock = threading.Lock()
+        self.refresh_timer = None
+        self.refresh_retry_delay = 0.0 # Backoff after failed refreshes; 0 after a success
+        self.next_refresh_at = 0.0 # time.monotonic() before which no refresh is tried
+        self.managed_creds = None
+        self.stats = {"refreshes": 0, "refresh_failures": 0, "refresh_seconds": 0.0, "last_refresh_seconds": None}
+
+    def _expires_soon(self, creds):
+        if creds.expiry is None:
+            return False
+        # google-auth keeps expiry as a naive UTC datetime
+        expiry = creds.expiry.replace(tzinfo=datetime.timezone.utc)
+        remaining = (expiry - datetime.datetime.now(datetime.timezone.utc)).total_seconds()
+        return remaining < TOKEN_REFRESH_MARGIN_SECONDS
+
+    def _load_from_disk(self):
+        from google.oauth2.credentials import Credentials
+        if os.path.exists(self.token_path):
             try:
-                print(f"No valid token found or token expired. Running authentication flow using {CREDENTIALS_JSON_FILE}...")
-                flow = InstalledAppFlow.from_client_secrets_file(
-                    CREDENTIALS_JSON_FILE, SCOPES)
-                creds = flow.run_local_server(port=8080)
-            except FileNotFoundError: # Should be caught by os.path.exists, but good to have as fallback
-                print(f"Error: Credentials file '{CREDENTIALS_JSON_FILE}' not found during flow.")
+                with open(self.token_path, 'r', encoding='utf-8') as token:
+                    token_info = json.load(token)
+                granted = token_info.get('scopes') or []
+                granted = granted.split() if isinstance(granted, str) else granted
+                if granted and not set(self.scopes) <= set(granted):
+                    print(f"The saved token does not grant {', '.join(sorted(set(self.scopes) - set(granted)))}; "
+                          "authorization is needed again.")
+                    return None
+                # Keep every granted scope, so refreshing for one tool does not drop another tool's scopes
+                return Credentials.from_authorized_user_info(token_info, granted or self.scopes)
+            except (ValueError, OSError) as e:
+                print(f"Error loading token from {self.token_path}. File might be corrupted or incompatible: {e}")
                 return None
-            except Exception as e:
-                print(f"Error during authentication flow: {e}")
-                creds = None
+        if os.path.exists(TOKEN_PICKLE_FILE):
+            with open(TOKEN_PICKLE_FILE, 'rb') as token:
+                try:
+                    creds = pickle.load(token)
+                except (pickle.UnpicklingError, EOFError, AttributeError, ImportError, IndexError) as e:
+                    print(f"Error loading token from {TOKEN_PICKLE_FILE}. File might be corrupted or incompatible: {e}")
+                    return None
+            print(f"Migrating {TOKEN_PICKLE_FILE} to {self.token_path}. The old file is no longer used and can be deleted.")
+            self.save(creds)
+            return creds
+        return None
+
+    def save(self, creds):
+        """Writes the token file atomically, readable only by the current user."""
+        temp_path = self.token_path + '.tmp'
+        try:
+            if os.path.exists(temp_path):
+                os.remove(temp_path) # Left by an interrupted save; O_CREAT would keep its permissions
+            descriptor = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            with os.fdopen(descriptor, 'w', encoding='utf-8') as token:
+                token.write(creds.to_json())
+            os.replace(temp_path, self.token_path)
+        except Exception as e:
+            print(f"Error saving token to {self.token_path}: {e}")
+            # Proceed with creds even if saving fails, but inform user
 
-        if creds:
+    def get_credentials(self):
+        """
+        Returns valid credentials, refreshing them first if they are close to
+        expiry, or None if there are none (or refreshing failed) and the
+        interactive flow is needed.
+        """
+        with self.lock:
+            if self.creds is None:
+                self.creds = self._load_from_disk()
+            if self.creds is None:
+                return None
+            if self.creds.valid and not self._expires_soon(self.creds):
+                return self.creds
+            if not self.creds.refresh_token:
+                return None
+            if time.monotonic() < self.next_refresh_at: # Backing off after a failed refresh
+                return self.creds if self.creds.valid else None
+            if self._refresh_locked() or self.creds.valid: # A failed early refresh can still use the current token
+                return self.creds
+            return None
+
+    def set_credentials(self, creds):
+        """Adopts credentials from the authentication flow and saves them."""
+        with self.lock:
+            self.creds = creds
+            self.save(creds)
+
+    def refresh_rejected(self, rejected_token=None):
+        """
+        Refreshes for a transport whose request was refused with rejected_token
+        (or that found the token invalid). If another thread has refreshed in
+        the meantime its token is reused, and during the failure backoff the
+        token endpoint is not called. Returns True if a usable token is available.
+        """
+        with self.lock:
+            if self.creds is None:
+                return False
+            if self.creds.token != rejected_token and self.creds.valid and not self._expires_soon(self.creds):
+                return True
+            if not self.creds.refresh_token or time.monotonic() < self.next_refresh_at:
+                return False
+            return self._refresh_locked(rejected_token)
+
+    def transport_credentials(self):
+        """
+        google-auth credentials for AuthorizedHttp/AuthorizedSession that read
+        the token from this manager and refresh through refresh_rejected(), so
+        transports never call the token endpoint on their own.
+        """
+        with self.lock:
+            if self.managed_creds is None:
+                self.managed_creds = _managed_credentials_class()(self)
+            return self.managed_creds
+
+    def _refresh_locked(self, rejected_token=None):
+        """
+        Refreshes self.creds; the caller holds self.lock. Returns True on success.
+        Failures set the backoff before the next attempt; a success clears it.
+        """
+        with _TokenFileLock(self.token_path + '.lock'):
+            # Another process may have refreshed while we waited for the file lock
+            on_disk = self._load_from_disk() if os.path.exists(self.token_path) else None
+            if (on_disk is not None and on_disk.valid and not self._expires_soon(on_disk)
+                    and on_disk.token != rejected_token):
+                # Update in place: authorized sessions and services built earlier hold this object
+                self.creds.token = on_disk.token
+                self.creds.expiry = on_disk.expiry
+                return True
+            from google.auth.transport.requests import Request
+            started_at = time.monotonic()
             try:
-                with open(TOKEN_PICKLE_FILE, 'wb') as token:
-                    pickle.dump(creds, token)
-                print("Authentication successful, token saved.")
+                print("Refreshing credentials...")
+                self.creds.refresh(Request())
             except Exception as e:
-                print(f"Error saving token to {TOKEN_PICKLE_FILE}: {e}")
-                # Proceed with creds even if saving fails, but inform user
-        else:
+                self.stats["refresh_failures"] += 1
+                # e.g. a revoked refresh token: do not call the token endpoint again right away
+                self.refresh_retry_delay = min(TOKEN_REFRESH_RETRY_MAX_SECONDS,
+                                               self.refresh_retry_delay * 2 or TOKEN_REFRESH_RETRY_SECONDS)
+                self.next_refresh_at = time.monotonic() + self.refresh_retry_delay
+                print(f"Error refreshing credentials: {e}")
+                return False
+            self.refresh_retry_delay, self.next_refresh_at = 0.0, 0.0
+            elapsed = time.monotonic() - started_at
+            self.stats["refreshes"] += 1
+            self.stats["refresh_seconds"] += elapsed
+            self.stats["last_refresh_seconds"] = elapsed
+            self.save(self.creds)
+            return True
+
+    def start_background_refresh(self):
+        """Keeps the shared credentials fresh from a daemon timer until stop() is called."""
+        with self.lock:
+            self._schedule_refresh_locked()
+
+    def _schedule_refresh_locked(self):
+        if self.refresh_timer is not None:
+            self.refresh_timer.cancel()
+        if self.creds is None or self.creds.expiry is None:
+            return
+        expiry = self.creds.expiry.replace(tzinfo=datetime.timezone.utc)
+        delay = (expiry - datetime.datetime.now(datetime.timezone.utc)).total_seconds() - TOKEN_REFRESH_MARGIN_SECONDS
+        self.refresh_timer = threading.Timer(max(1.0, delay, self.refresh_retry_delay), self._background_refresh)
+        self.refresh_timer.daemon = True
+        self.refresh_timer.start()
+
+    def _background_refresh(self):
+        with self.lock:
+            if self.creds is not None and self.creds.refresh_token and self._expires_soon(self.creds):
+                self._refresh_locked()
+            self._schedule_refresh_locked()
+
+    def stop(self):
+        with self.lock:
+            if self.refresh_timer is not None:
+                self.refresh_timer.cancel()
+                self.refresh_timer = None
+
+    def summary(self):
+        """One line describing the token refreshes done in this process."""
+        refreshes = self.stats["refreshes"]
+        average = (self.stats["refresh_seconds"] / refreshes * 1000) if refreshes else 0.0
+        return f"Token refreshes: {refreshes} (avg {average:.0f} ms), failed: {self.stats['refresh_failures']}"
+
+@functools.lru_cache(maxsize=None)
+def _managed_credentials_class():
+    """
+    The credentials class behind CredentialManager.transport_credentials(),
+    defined on first use so google-auth is only imported when needed.
+    """
+    from google.auth.credentials import Credentials
+    from google.auth.exceptions import RefreshError
+
+    class ManagedCredentials(Credentials):
+        def __init__(self, manager):
+            super().__init__()
+            self.manager = manager
+            self.applied = threading.local() # Token each thread last sent, to tell a stale rejection apart
+
+        @property
+        def token(self):
+            creds = self.manager.creds
+            return creds.token if creds is not None else None
+
+        @token.setter
+        def token(self, value):
+            pass # Set by some google-auth versions' __init__; the manager's credentials hold the token
+
+        @property
+        def valid(self):
+            creds = self.manager.creds
+            return creds is not None and creds.valid
+
+        def refresh(self, request):
+            if not self.manager.refresh_rejected(getattr(self.applied, 'token', None)):
+                raise RefreshError("The access token could not be refreshed.")
+
+        def before_request(self, request, method, url, headers):
+            if self.manager.get_credentials() is None:
+                raise RefreshError("No valid access token; refreshing failed or is backing off.")
+            self.apply(headers)
+
+        def apply(self, headers, token=None):
+            token = token or self.token
+            self.applied.token = token
+            headers['authorization'] = f'Bearer {token}'
+
+    return ManagedCredentials
+
+def _transport_credentials(creds):
+    """The credentials to authorize HTTP transports with: the shared manager's view of creds, if it holds them."""
+    if credential_manager is not None and creds is not None and creds is credential_manager.creds:
+        return credential_manager.transport_credentials()
+    return creds
+
+class _TokenFileLock:
+    """Exclusive inter-process lock on a side file; a no-op where fcntl is unavailable."""
+    def __init__(self, path):
+        self.path = path
+        self.lock_file = None
+
+    def __enter__(self):
+        try:
+            import fcntl
+        except ImportError: # Windows: threads are still serialised by CredentialManager.lock
+            return self
+        self.lock_file = open(self.path, 'a')
+        fcntl.flock(self.lock_file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.lock_file is not None:
+            import fcntl
+            fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+            self.lock_file.close()
+            self.lock_file = None
+
+credential_manager = None # Shared by every thread once authenticate() has run
+
+@_timed_stage("auth")
+def authenticate(background_refresh=False, scopes=None):
+    """
+    Handles Google OAuth 2.0 authentication.
+    Credentials are loaded once per process through the shared CredentialManager;
+    with background_refresh they are also kept fresh for long runs.
+    scopes defaults to SCOPES; a saved token lacking any of them is authorized again.
+    """
+    global credential_manager
+    print("Authenticating...")
+    scopes = scopes or SCOPES
+    if credential_manager is None or set(credential_manager.scopes) != set(scopes):
+        credential_manager = CredentialManager(scopes=scopes)
+    creds = credential_manager.get_credentials()
+    if creds:
+        print("Using valid existing credentials.")
+    else:
+        if not os.path.exists(CREDENTIALS_JSON_FILE):
+            print(f"Error: Credentials file '{CREDENTIALS_JSON_FILE}' not found.")
+            print("Please download your OAuth 2.0 client secrets file from Google Cloud Console,")
+            print(f"name it '{CREDENTIALS_JSON_FILE}', and place it in the same directory as this script.")
+            return None
+        try:
+            print(f"No valid token found or token expired. Running authentication flow using {CREDENTIALS_JSON_FILE}...")
+            from google_auth_oauthlib.flow import InstalledAppFlow
+            flow = InstalledAppFlow.from_client_secrets_file(
+                CREDENTIALS_JSON_FILE, credential_manager.scopes)
+            creds = flow.run_local_server(port=8080)
+        except FileNotFoundError: # Should be caught by os.path.exists, but good to have as fallback
+            print(f"Error: Credentials file '{CREDENTIALS_JSON_FILE}' not found during flow.")
+            return None
+        except Exception as e:
+            print(f"Error during authentication flow: {e}")
+            creds = None
+
+        if not creds:
             print("Authentication failed. Please ensure credentials are valid and the authentication flow can complete.")
             return None
-    else:
-        print("Using valid existing credentials.")
+        credential_manager.set_credentials(creds)
+        print("Authentication successful, token saved.")
+    if background_refresh:
+        credential_manager.start_background_refresh()
     return creds
 
-def _create_form_and_set_quiz(service, form_title, document_title):
+class TokenBucket:
+    """
+    Thread-safe token bucket shared by all workers so that together they stay
+    under a per-minute request quota. acquire() blocks until a token is free.
+    """
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = capacity or max(1, rate_per_minute // 6) # Allow bursts of about 10 seconds of quota
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate_per_second)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_seconds = (1 - self.tokens) / self.rate_per_second
+            time.sleep(wait_seconds)
+
+class RetryBudget:
+    """
+    Thread-safe cap on how many retries a form or a whole run may spend. With
+    window_seconds, only the retries of that many recent seconds count, so a
+    long-running daemon is not left without retries after its first bad hour.
+    """
+    def __init__(self, limit, window_seconds=None):
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.used = 0
+        self.taken_at = collections.deque() # Times of the retries in the window
+        self.lock = threading.Lock()
+
+    def take(self):
+        """Uses one retry. Returns False if the budget is already spent."""
+        with self.lock:
+            if self.window_seconds is not None:
+                now = time.monotonic()
+                while self.taken_at and now - self.taken_at[0] > self.window_seconds:
+                    self.taken_at.popleft()
+                self.used = len(self.taken_at)
+            if self.used >= self.limit:
+                return False
+            self.used += 1
+            if self.window_seconds is not None:
+                self.taken_at.append(now)
+            return True
+
+_thread_state = threading.local() # Per-worker service and retry budget
+
+# Set by batch mode; every API call waits for a token when this is not None
+write_rate_limiter = None
+run_retry_budget = RetryBudget(RETRY_BUDGET_PER_RUN)
+retry_stats = {"retries": 0, "backoff_seconds": 0.0, "gave_up": 0}
+_retry_stats_lock = threading.Lock()
+
+def _start_form_retry_budget():
+    """Gives the form this thread is about to build a fresh per-form retry budget."""
+    _thread_state.form_retry_budget = RetryBudget(RETRY_BUDGET_PER_FORM)
+
+def _is_retryable(error):
+    """Classifies an API error as transient (worth retrying) or fatal."""
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    if not isinstance(error, HttpError):
+        return False
+    status = error.resp.status
+    if status in RETRYABLE_STATUS_CODES:
+        return True
+    # Quota errors are sometimes reported as 403 rateLimitExceeded/userRateLimitExceeded
+    content = error.content.decode('utf-8', 'replace') if isinstance(error.content, bytes) else str(error.content)
+    return status == 403 and 'ratelimitexceeded' in content.lower()
+
+def _is_quota_error(error):
+    """True for 429s and rate-limit 403s: the project is over quota, the API is not struggling."""
+    return isinstance(error, HttpError) and error.resp.status in (403, 429)
+
+def _is_size_error(error):
+    """True for errors saying a batch was too big or too slow: 413, 504 and 400s about the payload size."""
+    if not isinstance(error, HttpError):
+        return False
+    status = error.resp.status
+    if status in (413, 504):
+        return True
+    content = error.content.decode('utf-8', 'replace') if isinstance(error.content, bytes) else str(error.content)
+    return status == 400 and any(marker in content.lower() for marker in SIZE_ERROR_MARKERS)
+
+def _retry_after_seconds(error):
+    """Returns the delay asked for by a Retry-After header (seconds or HTTP date), or None."""
+    resp = getattr(error, 'resp', None)
+    value = resp.get('retry-after') if resp is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    import email.utils # Only needed for the rare HTTP-date form
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+def _backoff_seconds(attempt, error):
+    """Capped exponential backoff with full jitter, never shorter than Retry-After."""
+    delay = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt)))
+    retry_after = _retry_after_seconds(error)
+    if retry_after is not None:
+        delay = retry_after + random.uniform(0, BACKOFF_BASE_SECONDS)
+    return delay
+
+def _execute(api_request):
+    """
+    Runs a prepared API request, waiting on the shared rate limiter first if one
+    is set. Transient errors (429, 5xx, rate-limit 403s, dropped connections)
+    are retried with backoff while the per-call, per-form and per-run budgets
+    allow; the last error is re-raised otherwise.
+    Note that a retried forms().create whose first attempt did reach the server
+    can leave an extra empty form behind.
+    """
+    attempt = 0
+    congestion_retries = 0 # Retries for other reasons than quota, a signal for AdaptiveBatchSize
+    started = time.perf_counter()
+    waited = 0.0 # Time spent on the rate limiter, reported separately in the metrics
+    try:
+        while True:
+            if write_rate_limiter is not None:
+                wait_started = time.perf_counter()
+                write_rate_limiter.acquire()
+                waited += time.perf_counter() - wait_started
+            attempt_started = time.perf_counter()
+            try:
+                result = api_request.execute()
+                _thread_state.last_call = (time.perf_counter() - attempt_started, congestion_retries)
+                break
+            except (HttpError, ConnectionError, TimeoutError) as e:
+                if not _is_retryable(e):
+                    raise
+                if not _is_quota_error(e):
+                    congestion_retries += 1
+                form_budget = getattr(_thread_state, 'form_retry_budget', None)
+                if (attempt >= MAX_RETRIES_PER_CALL
+                        or (form_budget is not None and not form_budget.take())
+                        or not run_retry_budget.take()):
+                    with _retry_stats_lock:
+                        retry_stats["gave_up"] += 1
+                    raise
+                delay = _backoff_seconds(attempt, e)
+                with _retry_stats_lock:
+                    retry_stats["retries"] += 1
+                    retry_stats["backoff_seconds"] += delay
+                print(f"Transient API error ({str(e) or type(e).__name__}). Retrying in {delay:.1f}s (attempt {attempt + 2})...")
+                time.sleep(delay)
+                attempt += 1
+    except Exception as e:
+        if run_metrics is not None:
+            run_metrics.record_call(api_request, time.perf_counter() - started, waited, attempt, error=e)
+        raise
+    if run_metrics is not None:
+        run_metrics.record_call(api_request, time.perf_counter() - started, waited, attempt, result=result)
+    return result
+
+def _retry_summary():
+    """One line describing the retries spent so far in this run (two with adaptive batch sizes in use)."""
+    summary = (f"API retries: {retry_stats['retries']} ({retry_stats['backoff_seconds']:.1f}s backing off), "
+               f"calls given up: {retry_stats['gave_up']}")
+    if batch_sizer is not None and batch_sizer.stats["chunks"]:
+        summary += "\n" + batch_sizer.summary()
+    return summary
+
+class AdaptiveBatchSize:
+    """
+    AIMD controller of the batchUpdate chunk size, shared by all worker threads.
+    A chunk that was full and landed within ADAPTIVE_TARGET_SECONDS without
+    retries grows the item limit by ADAPTIVE_ITEMS_STEP; a slow chunk, one that
+    needed retries (other than for quota) or one that failed as too large or
+    with a server error shrinks it by ADAPTIVE_DECREASE_FACTOR. Quota and other
+    client errors leave it alone, since they say nothing about the chunk size. A request-size error also halves the byte limit,
+    which then grows back by ADAPTIVE_BYTES_STEP but stays below the rejected size.
+    Chunks built before the last decrease do not decrease it again, so a burst
+    of slow calls from several workers counts as one signal. Every change is
+    printed (decreases) and recorded in the run metrics.
+    """
+    def __init__(self, items=MAX_ITEMS_PER_BATCH, max_bytes=MAX_BATCH_BYTES):
+        self.items = items
+        self.max_bytes = max_bytes
+        self.bytes_ceiling = max_bytes # Lowered below the body size of every rejected chunk
+        self.lock = threading.Lock()
+        self.stats = {"chunks": 0, "items_sent": 0, "increases": 0, "decreases": 0,
+                      "start_items": items, "smallest_items": items, "largest_items": items}
+
+    def limits(self):
+        """The (max_items, max_bytes) the next chunk should be built with."""
+        with self.lock:
+            return self.items, self.max_bytes
+
+    def observe(self, requests, body_bytes, seconds, limit, retries=0, error=None):
+        """
+        Feeds back one sent chunk: its request count and body size, the time of
+        its final attempt (None if it failed), the item limit it was built with,
+        its congestion retries and the error it failed with, if any.
+        """
+        if error is not None and (_is_quota_error(error) or
+                                  (not _is_size_error(error) and error.resp.status < 500)):
+            return
+        with self.lock:
+            old_items, old_bytes = self.items, self.max_bytes
+            if error is None:
+                self.stats["chunks"] += 1
+                self.stats["items_sent"] += requests
+            if error is not None and _is_size_error(error):
+                if error.resp.status != 504: # A gateway timeout says nothing about the byte limit
+                    self.bytes_ceiling = max(ADAPTIVE_MIN_BYTES, min(self.bytes_ceiling, body_bytes - 1))
+                    self.max_bytes = max(ADAPTIVE_MIN_BYTES, min(self.max_bytes, body_bytes) // 2)
+                else: # Halve from the chunk itself, which may have been shorter than the limit
+                    self.items = max(ADAPTIVE_MIN_ITEMS, min(self.items, int(requests * ADAPTIVE_DECREASE_FACTOR)))
+                reason = f"request too large or slow ({error.resp.status})"
+            elif error is not None:
+                reason = f"failed ({getattr(error.resp, 'status', 'error')})"
+            elif retries:
+                reason = f"{retries} retries"
+            elif seconds > ADAPTIVE_TARGET_SECONDS:
+                reason = f"took {seconds:.1f}s"
+            else:
+                reason = None
+            if reason is not None:
+                if limit <= self.items and self.items == old_items: # Not yet reacted to this chunk's conditions
+                    self.items = max(ADAPTIVE_MIN_ITEMS, int(self.items * ADAPTIVE_DECREASE_FACTOR))
+            elif requests >= self.items:
+                self.items = min(ADAPTIVE_MAX_ITEMS, self.items + ADAPTIVE_ITEMS_STEP)
+                reason = f"full chunk in {seconds:.1f}s"
+            elif body_bytes * 10 >= self.max_bytes * 9 and self.max_bytes < self.bytes_ceiling:
+                self.max_bytes = min(self.bytes_ceiling, self.max_bytes + ADAPTIVE_BYTES_STEP)
+                reason = f"near the byte limit in {seconds:.1f}s"
+            if (self.items, self.max_bytes) == (old_items, old_bytes):
+                return
+            self.stats["increases" if self.items >= old_items and self.max_bytes >= old_bytes else "decreases"] += 1
+            self.stats["smallest_items"] = min(self.stats["smallest_items"], self.items)
+            self.stats["largest_items"] = max(self.stats["largest_items"], self.items)
+            new_items, new_bytes = self.items, self.max_bytes
+        if new_items < old_items or new_bytes < old_bytes:
+            print(f"Batch size lowered to {new_items} items / {new_bytes} bytes per call ({reason}).")
+        if run_metrics is not None:
+            run_metrics.record("batch_size", items=new_items, max_bytes=new_bytes, previous_items=old_items,
+                               previous_bytes=old_bytes, reason=reason)
+
+    def summary(self):
+        with self.lock:
+            stats = dict(self.stats, items=self.items, max_bytes=self.max_bytes)
+        return (f"Batch size: {stats['start_items']} -> {stats['items']} items per call "
+                f"(range {stats['smallest_items']}-{stats['largest_items']}, {stats['increases']} increases, "
+                f"{stats['decreases']} decreases, mean {stats['items_sent'] / stats['chunks']:.0f} requests "
+                f"over {stats['chunks']} chunks), byte limit {stats['max_bytes']}")
+
+batch_sizer = None # AdaptiveBatchSize used by _run_batches unless --fixed-batch-size is given
+
+class DiscoveryFileCache:
+    """
+    Keeps the Forms discovery document in DISCOVERY_CACHE_FILE, tagged with the
+    cache format and client library version so that upgrades refetch it.
+    Also implements the get(url)/set(url, content) cache interface used by
+    googleapiclient.discovery.build.
+    """
+    def __init__(self, path=DISCOVERY_CACHE_FILE):
+        self.path = path
+
+    def _client_version(self):
+        try:
+            from googleapiclient.version import __version__ # The package itself has no __version__
+        except ImportError:
+            return 'unknown'
+        return __version__
+
+    def load(self, allow_stale=False):
+        """Returns the cached document text, or None if missing, outdated or unreadable."""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as cache_file:
+                cached = json.load(cache_file)
+        except (OSError, ValueError):
+            return None
+        if cached.get('format') != DISCOVERY_CACHE_FORMAT or cached.get('client_version') != self._client_version():
+            return None
+        if not allow_stale and time.time() - cached.get('fetched_at', 0) > DISCOVERY_CACHE_MAX_AGE_SECONDS:
+            return None
+        return cached.get('document')
+
+    def get(self, url):
+        return self.load()
+
+    def set(self, url, content):
+        cached = {"format": DISCOVERY_CACHE_FORMAT, "client_version": self._client_version(),
+                  "fetched_at": time.time(), "url": url, "document": content}
+        temp_path = self.path + '.tmp'
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as cache_file:
+                json.dump(cached, cache_file)
+            os.replace(temp_path, self.path) # Never leave a half-written cache behind
+        except OSError as e:
+            print(f"Warning: Could not save the discovery document to {self.path}: {e}")
+
+_parsed_discovery_document = None # Reused by every later build in this process
+
+@_timed_stage("service_build")
+def _build_service(creds, http=None):
+    """
+    Builds the Forms API service. Returns None (after printing why) if that fails.
+    A fresh cached discovery document is used directly with no network access.
+    Otherwise the document is fetched and cached. If fetching fails, or in
+    offline mode, the build falls back to a stale cached copy or the document
+    bundled with the client library.
+    With http (e.g. a PooledHttp), requests go through it instead of a new
+    httplib2 connection authorized with creds.
+    """
+    global _parsed_discovery_document
+    print("\nBuilding Google Forms service...")
+    auth = {"http": http} if http is not None else {"credentials": _transport_credentials(creds)}
+    try:
+        from googleapiclient.discovery import build, build_from_document
+        if _parsed_discovery_document is not None: # Later builds (one per worker thread) are cheap
+            return build_from_document(_parsed_discovery_document, **auth)
+        cache = DiscoveryFileCache()
+        document = cache.load(allow_stale=offline_mode)
+        if document is None and not offline_mode:
+            try:
+                return build('forms', 'v1', cache=cache, static_discovery=False, **auth)
+            except Exception as e: # Network or discovery errors: fall back to an offline build
+                print(f"Could not fetch the discovery document ({e}). Building offline...")
+        if document is None:
+            document = cache.load(allow_stale=True)
+        if document is None:
+            return build('forms', 'v1', static_discovery=True, **auth)
+        _parsed_discovery_document = json.loads(document)
+        return build_from_document(_parsed_discovery_document, **auth)
+    except Exception as e: # Catch errors during service build
+        print(f"Failed to build Google Forms API service: {e}")
+        return None
+
+class PooledHttp:
+    """
+    Thread-safe stand-in for httplib2.Http, the object the client library sends
+    requests through. It wraps an AuthorizedSession (requests with a pool of
+    keep-alive connections), so the services of all worker threads share a few
+    open connections instead of each paying its own TCP/TLS handshakes.
+    """
+    def __init__(self, creds, pool_size):
+        from google.auth.transport.requests import AuthorizedSession
+        from requests.adapters import HTTPAdapter
+        self.session = AuthorizedSession(_transport_credentials(creds))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.timeout = HTTP_TIMEOUT_SECONDS
+
+    def request(self, uri, method='GET', body=None, headers=None, redirections=5, connection_type=None):
+        """
+        Same call and return shape as httplib2.Http.request: (response, content bytes).
+        Network errors from requests are raised as the built-in TimeoutError and
+        ConnectionError, which _execute retries like httplib2's.
+        """
+        import httplib2
+        import requests.exceptions
+        try:
+            response = self.session.request(method, uri, data=body, headers=headers, timeout=self.timeout,
+                                            allow_redirects=redirections > 0)
+        except requests.exceptions.Timeout as e: # Before ConnectionError: ConnectTimeout is both
+            raise TimeoutError(str(e)) from e
+        except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError) as e:
+            raise ConnectionError(str(e)) from e
+        info = {name.lower(): value for name, value in response.headers.items()}
+        info['status'] = str(response.status_code)
+        http_response = httplib2.Response(info)
+        http_response.reason = response.reason
+        return http_response, response.content
+
+    def close(self):
+        self.session.close()
+
+def _pooled_http(creds, pool_size):
+    """Returns a PooledHttp, or None (after printing why) if requests is not installed."""
+    try:
+        return PooledHttp(creds, pool_size)
+    except ImportError as e:
+        print(f"Pooled HTTP transport unavailable ({e}); each worker uses its own connection. "
+              "Install 'requests' to enable it.")
+        return None
+
+@_timed_stage("create", succeeded=lambda result: result[0] is not None)
+def _create_form(service, form_title, document_title):
+    """Creates an empty form. Returns (form_id, responder_uri), or (None, None) on failure."""
+    print(f"Creating form with title: '{form_title}'...")
+    _start_form_retry_budget()
+    try:
+        created_form_result = _execute(service.forms().create(body=_new_form_body(form_title, document_title)))
+        form_id_created = created_form_result['formId']
+        print(f"Form scaffold created successfully. Form ID: {form_id_created}")
+        return form_id_created, created_form_result['responderUri']
+    except HttpError as e:
+        print(f"Error creating form scaffold: {e}. Check API permissions and quota.")
+        return None, None # Form creation failed
+
+def _new_form_body(form_title, document_title):
+    """The forms().create body for an empty form."""
+    return {
+        "info": {
+            "title": form_title,
+            "documentTitle": document_title
+        }
+    }
+
+def _quiz_settings_request():
+    """The batchUpdate request that turns a form into a quiz."""
+    return {
+        "updateSettings": {
+            "settings": {"quizSettings": {"isQuiz": True}},
+            "updateMask": "quizSettings" # Broader mask as specified
+        }
+    }
+
+@_timed_stage("quiz_settings", succeeded=bool)
+def _set_form_as_quiz(service, form_id, responder_uri):
+    """Sends the quiz settings on their own. Returns True on success."""
+    print(f"Configuring form '{form_id}' as a quiz...")
+    try:
+        _execute(service.forms().batchUpdate(
+            formId=form_id,
+            body={"requests": [_quiz_settings_request()]}
+        ))
+        print(f"Form '{form_id}' successfully configured as a quiz.")
+        return True
+    except HttpError as e:
+        print(f"Error updating form settings to quiz for form ID {form_id}: {e}")
+        print(f"The form was created (ID: {form_id}, URI: {responder_uri}), but could not be set as a quiz.")
+        return False
+
+class ProvisioningJournal:
+    """
+    Append-only JSON Lines log of the provisioning steps completed per job
+    (form_created, quiz_set, chunk_added, completed). Each record is flushed to
+    disk before the next API call, so a crashed or failed run can be resumed
+    from the first incomplete step of the same form.
+    The file is read once, on first use, into an index of unfinished jobs and
+    rewritten without the finished ones, so it does not grow run after run.
+    Appends and the rewrite hold an exclusive lock on a side file, so processes
+    sharing a journal do not lose each other's records.
+    """
+    def __init__(self, path=JOURNAL_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.unfinished = None # job key -> progress of its last unfinished run, loaded on first use
+        self.in_flight = set() # Job keys being provisioned by this process
+        self.in_flight_changed = threading.Condition()
+
+    @contextlib.contextmanager
+    def claim(self, job_key):
+        """
+        Marks job_key as in progress in this process for the duration of the block.
+        pending() cannot tell a crashed run from one still going, so an identical
+        job must not start (and "resume" the live form) until the first one ends:
+        claim() waits for it. Yields True if it had to wait.
+        """
+        waited = False
+        with self.in_flight_changed:
+            while job_key in self.in_flight:
+                waited = True
+                self.in_flight_changed.wait()
+            self.in_flight.add(job_key)
+        try:
+            yield waited
+        finally:
+            with self.in_flight_changed:
+                self.in_flight.discard(job_key)
+                self.in_flight_changed.notify_all()
+
+    def _apply(self, entry):
+        """Updates the index of unfinished jobs with one journal record."""
+        job_key, step = entry.get("job"), entry.get("step")
+        if step == "form_created":
+            self.unfinished[job_key] = {"form_id": entry["form_id"], "responder_uri": entry.get("responder_uri"),
+                                        "quiz_set": False, "items_added": 0}
+            return
+        state = self.unfinished.get(job_key)
+        if state is None:
+            return
+        if step == "quiz_set":
+            state["quiz_set"] = True
+        elif step == "chunk_added":
+            state["items_added"] = entry["items_added"]
+        elif step == "completed":
+            del self.unfinished[job_key]
+
+    def _load_locked(self):
+        """Builds the index from the file and compacts it; the caller holds self.lock."""
+        self.unfinished = {}
+        with _TokenFileLock(self.path + '.lock'):
+            try:
+                journal_file = open(self.path, 'r', encoding='utf-8')
+            except FileNotFoundError:
+                return
+            records = 0
+            with journal_file:
+                for line in journal_file:
+                    records += 1
+                    try:
+                        self._apply(json.loads(line))
+                    except (json.JSONDecodeError, KeyError, AttributeError):
+                        continue # A crash can leave the last line half written
+            lines = []
+            for job_key, state in self.unfinished.items():
+                lines.append({"job": job_key, "step": "form_created", "form_id": state["form_id"],
+                              "responder_uri": state["responder_uri"]})
+                if state["quiz_set"]:
+                    lines.append({"job": job_key, "step": "quiz_set", "form_id": state["form_id"]})
+                if state["items_added"]:
+                    lines.append({"job": job_key, "step": "chunk_added", "form_id": state["form_id"],
+                                  "items_added": state["items_added"]})
+            if len(lines) == records:
+                return
+            now = time.time()
+            temp_path = self.path + '.tmp'
+            try:
+                with open(temp_path, 'w', encoding='utf-8') as compacted:
+                    for entry in lines:
+                        entry["time"] = now
+                        compacted.write(json.dumps(entry, separators=(',', ':')) + "\n")
+                    compacted.flush()
+                    os.fsync(compacted.fileno())
+                os.replace(temp_path, self.path) # Never leave a half-written journal behind
+            except OSError as e:
+                print(f"Warning: Could not compact the journal {self.path}: {e}")
+
+    def record(self, job_key, step, **details):
+        entry = {"job": job_key, "step": step, "time": time.time()}
+        entry.update(details)
+        line = json.dumps(entry, separators=(',', ':')) + "\n"
+        with self.lock:
+            if self.unfinished is None:
+                self._load_locked()
+            with _TokenFileLock(self.path + '.lock'):
+                with open(self.path, 'a', encoding='utf-8') as journal_file:
+                    journal_file.write(line)
+                    journal_file.flush()
+                    os.fsync(journal_file.fileno())
+            self._apply(entry)
+
+    def pending(self, job_key):
+        """
+        Returns the progress of the job's last unfinished run as a dict with
+        form_id, responder_uri, quiz_set and items_added, or None if there is
+        nothing to resume.
+        """
+        with self.lock:
+            if self.unfinished is None:
+                self._load_locked()
+            state = self.unfinished.get(job_key)
+            return dict(state) if state else None
+
+def _job_key(form_title, document_title, questions_source):
+    """
+    Stable journal key for a job. questions_source is a question bank path (its
+    contents are hashed, so an edited bank is a new job) or an in-memory list.
+    Returns None when the source cannot be identified, e.g. stdin.
+    """
+    digest = hashlib.sha256(json.dumps([form_title, document_title]).encode('utf-8'))
+    if isinstance(questions_source, str):
+        if questions_source == '-':
+            return None
+        with open(questions_source, 'rb') as bank_file:
+            for block in iter(lambda: bank_file.read(1024 * 1024), b''):
+                digest.update(block)
+    else:
+        digest.update(json.dumps(questions_source, sort_keys=True, default=list).encode('utf-8'))
+    return digest.hexdigest()
+
+def _normalize_text(text):
+    """Collapses whitespace and applies Unicode NFC so cosmetic edits do not change a hash."""
+    return unicodedata.normalize('NFC', ' '.join(text.split()))
+
+def _content_key(form_title, document_title, questions):
+    """
+    Stable hash of a quiz's inputs: both titles and the normalized Questions,
+    read as a stream. Used as the FormCache key.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps([_normalize_text(form_title), _normalize_text(document_title)]).encode('utf-8'))
+    for question in questions:
+        digest.update(json.dumps([_normalize_text(question.text), [_normalize_text(option) for option in question.options],
+                                  question.correct_index, question.points]).encode('utf-8'))
+        digest.update(b'\n')
+    return digest.hexdigest()
+
+class FormCache:
+    """
+    Local index from a content hash of a quiz's inputs (see _content_key) to
+    the form already created from them, so an identical rerun can return the
+    existing form without any API call. Entries expire after ttl_seconds and
+    the least recently used ones are evicted beyond max_entries.
+    Lookups only change memory; store() and flush() merge the changes into the
+    file under an exclusive lock on a side file, so processes sharing the cache
+    do not lose each other's entries.
+    """
+    def __init__(self, path=FORM_CACHE_FILE, ttl_seconds=FORM_CACHE_TTL_DAYS * 86400,
+                 max_entries=FORM_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.entries = None
+        self.changed = {} # Entries stored or used since the last save
+        self.expired = set() # Keys found expired since the last save
+        self.lock = threading.Lock()
+
+    def _read_file(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as cache_file:
+                return json.load(cache_file).get('forms', {})
+        except (OSError, ValueError, AttributeError):
+            return {}
+
+    def _load_locked(self):
+        if self.entries is None:
+            self.entries = self._read_file()
+        return self.entries
+
+    def _save_locked(self, replace=False):
+        """
+        Merges this process's changes into the file as it is now (or, with
+        replace, overwrites it with self.entries) and evicts the least recently
+        used entries beyond max_entries; the caller holds self.lock.
+        """
+        with _TokenFileLock(self.path + '.lock'):
+            entries = self.entries if replace else self._read_file()
+            for key in self.expired:
+                entries.pop(key, None)
+            for key, entry in self.changed.items():
+                on_disk = entries.get(key)
+                if on_disk is None or on_disk['created_at'] <= entry['created_at']:
+                    entries[key] = entry
+                else: # Another process stored a newer form for the same inputs
+                    on_disk['last_used'] = max(on_disk['last_used'], entry['last_used'])
+            if len(entries) > self.max_entries:
+                by_last_use = sorted(entries, key=lambda cached_key: entries[cached_key]['last_used'])
+                for stale_key in by_last_use[:len(entries) - self.max_entries]:
+                    del entries[stale_key]
+            temp_path = self.path + '.tmp'
+            try:
+                with open(temp_path, 'w', encoding='utf-8') as cache_file:
+                    json.dump({"forms": entries}, cache_file, indent=1)
+                os.replace(temp_path, self.path)
+            except OSError as e:
+                print(f"Warning: Could not save the form cache to {self.path}: {e}")
+                return
+        self.entries = entries
+        self.changed, self.expired = {}, set()
+
+    def lookup(self, key):
+        """Returns the cached entry (form_id, responder_uri, ...) for key, or None."""
+        with self.lock:
+            entries = self._load_locked()
+            entry = entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry['created_at'] > self.ttl_seconds:
+                del entries[key]
+                self.changed.pop(key, None)
+                self.expired.add(key)
+                return None
+            entry['last_used'] = time.time()
+            self.changed[key] = entry
+            return entry
+
+    def store(self, key, form_id, responder_uri, title):
+        with self.lock:
+            entries = self._load_locked()
+            now = time.time()
+            entries[key] = self.changed[key] = {"form_id": form_id, "responder_uri": responder_uri,
+                                                "title": title, "created_at": now, "last_used": now}
+            self.expired.discard(key)
+            self._save_locked()
+
+    def flush(self):
+        """Writes the use times and expiries recorded by lookups since the last save, if any."""
+        with self.lock:
+            if self.changed or self.expired:
+                self._save_locked()
+
+    def clear(self):
+        with self.lock:
+            self.entries = {}
+            self.changed, self.expired = {}, set()
+            self._save_locked(replace=True)
+
+def _form_progress(service, form_id, journal_state):
+    """
+    Works out where to resume a journaled form. The live form is asked first,
+    since a crash may have happened after a chunk landed but before it was
+    journaled; the journal is the fallback if that read fails.
+    Returns (items_already_in_form, quiz_already_set).
+    """
+    try:
+        form = _execute(service.forms().get(formId=form_id))
+    except HttpError as e:
+        print(f"Could not read form '{form_id}' to check its progress ({e}). Using the journal instead.")
+        return journal_state["items_added"], journal_state["quiz_set"]
+    is_quiz = form.get("settings", {}).get("quizSettings", {}).get("isQuiz", False)
+    return len(form.get("items", [])), is_quiz
+
+@_timed_stage("provision", succeeded=lambda result: result[2] and result[3])
+def _provision_quiz_form(service, form_title, document_title, questions_data, journal=None, job_key=None):
+    """
+    Creates a quiz form with its questions in two round trips: forms().create,
+    then one batchUpdate carrying the quiz settings together with the first
+    chunk of questions (later chunks follow as needed).
+    With a journal and job_key, each completed step is journaled and an
+    unfinished earlier run of the same job is resumed instead of starting over.
+    Returns (form_id, responder_uri, quiz_setup_success, questions_added_success).
+    form_id and responder_uri will be None if form creation itself fails.
+    """
+    if journal is None or job_key is None:
+        journal = job_key = None
+    resume_state = journal.pending(job_key) if journal else None
+    if resume_state:
+        form_id, responder_uri = resume_state["form_id"], resume_state["responder_uri"]
+        _start_form_retry_budget()
+        items_done, quiz_done = _form_progress(service, form_id, resume_state)
+        print(f"Resuming form '{form_id}' from the journal: {items_done} items already added, "
+              f"quiz setup {'done' if quiz_done else 'pending'}.")
+    else:
+        form_id, responder_uri = _create_form(service, form_title, document_title)
+        if form_id is None:
+            return None, None, False, False
+        if journal:
+            journal.record(job_key, "form_created", form_id=form_id, responder_uri=responder_uri)
+        items_done, quiz_done = 0, False
+
+    quiz_journaled = quiz_done
+    def journal_chunk(items_added, quiz_set):
+        nonlocal quiz_journaled
+        if quiz_set and not quiz_journaled:
+            journal.record(job_key, "quiz_set", form_id=form_id)
+            quiz_journaled = True
+        journal.record(job_key, "chunk_added", form_id=form_id, items_added=items_done + items_added)
+
+    if quiz_done:
+        print(f"Adding the remaining questions to form '{form_id}'...")
+    else:
+        print(f"Configuring form '{form_id}' as a quiz and adding questions...")
+    page_breaks = 0
+    def count_page_breaks(requests):
+        nonlocal page_breaks
+        for request in requests:
+            page_breaks += isinstance(request, PageBreak)
+            yield request
+    question_requests = itertools.islice(count_page_breaks(_valid_question_requests(questions_data)), items_done, None)
+    success, items_added, quiz_setup_success = _run_batches(
+        service, form_id, question_requests, start_index=items_done,
+        leading_requests=None if quiz_done else [_quiz_settings_request()], responder_uri=responder_uri,
+        on_chunk_done=journal_chunk if journal else None)
+    items_added += items_done
+    if not success:
+        return form_id, responder_uri, quiz_setup_success, False
+    if not items_added:
+        print("No valid questions to add after data validation.")
+        return form_id, responder_uri, quiz_setup_success, False
+    if journal:
+        journal.record(job_key, "completed", form_id=form_id)
+    sections = f" in {page_breaks + 1} sections" if page_breaks else ""
+    print(f"{items_added - page_breaks} questions added successfully to the form{sections}!")
+    return form_id, responder_uri, quiz_setup_success, True
+
+def _validate_question(question_text, options_list, correct_option_index, points_value):
+    """
+    Checks a single question against the rules the form needs.
+    Returns None if the question is valid, otherwise a short error message.
+    """
+    if not isinstance(question_text, str) or not question_text.strip():
+        return "question text must be a non-empty string"
+    if not isinstance(options_list, list) or len(options_list) < 2:
+        return "at least 2 options are required"
+    if not all(isinstance(option, str) and option.strip() for option in options_list):
+        return "every option must be a non-empty string"
+    # bool is a subclass of int, but True/False (e.g. YAML yes/no) are never meant as numbers here
+    if (not isinstance(correct_option_index, int) or isinstance(correct_option_index, bool)
+            or not 0 <= correct_option_index < len(options_list)):
+        return f"correct answer index must be between 0 and {len(options_list) - 1}"
+    if not isinstance(points_value, int) or isinstance(points_value, bool) or points_value <= 0:
+        return "point value must be a positive integer"
+    return None
+
+# Precompiled JSON for a graded multiple-choice item; only the values are filled in per question
+_ITEM_JSON_TEMPLATE = ('{"title":%s,"questionItem":{"question":{"required":true,'
+                       '"choiceQuestion":{"type":"RADIO","options":[%s],"shuffle":true},'
+                       '"grading":{"pointValue":%d,"correctAnswers":{"answers":[{"value":%s}]}}}}}')
+_OPTION_JSON_TEMPLATE = '{"value":%s}'
+_encode_json_string = json.encoder.encode_basestring_ascii # ASCII-only output, so len() == bytes sent
+
+class Question:
+    """
+    One validated multiple-choice question. Validation happens once, when the
+    question is created (at import time), so later stages can build payloads
+    straight from the precompiled JSON templates without re-checking anything.
+    __slots__ keeps instances small for banks of 100k questions. Iterating a
+    Question gives (text, options, correct_index, points), like the old tuples.
+    """
+    __slots__ = ('text', 'options', 'correct_index', 'points')
+
+    def __init__(self, text, options, correct_index, points):
+        options_list = list(options) if isinstance(options, tuple) else options
+        error = _validate_question(text, options_list, correct_index, points)
+        if error:
+            raise ValueError(error)
+        self.text = text
+        self.options = tuple(options_list)
+        self.correct_index = correct_index
+        self.points = points
+
+    def __iter__(self):
+        return iter((self.text, list(self.options), self.correct_index, self.points))
+
+    def __eq__(self, other):
+        return isinstance(other, Question) and tuple(self) == tuple(other)
+
+    def __repr__(self):
+        return f"Question({self.text!r}, {list(self.options)!r}, {self.correct_index}, {self.points})"
+
+    def item_json(self):
+        """The form item for this question as compact JSON text."""
+        options_json = ','.join([_OPTION_JSON_TEMPLATE % _encode_json_string(option) for option in self.options])
+        return _ITEM_JSON_TEMPLATE % (_encode_json_string(self.text), options_json, self.points,
+                                      _encode_json_string(self.options[self.correct_index]))
+
+    def item(self):
+        """The form item for this question as a dict."""
+        return json.loads(self.item_json())
+
+class PageBreak:
+    """A page break item starting a new section; appended in order like a Question."""
+    __slots__ = ('title',)
+
+    def __init__(self, title):
+        self.title = title
+
+    def __repr__(self):
+        return f"PageBreak({self.title!r})"
+
+    def item_json(self):
+        return '{"title":%s,"pageBreakItem":{}}' % _encode_json_string(self.title)
+
+def _valid_question_requests(questions_data):
+    """
+    Yields a Question per valid entry, warning about the ones skipped. Entries
+    that are already Question objects were validated at import and pass as is,
+    as do PageBreak items.
+    """
+    for question in questions_data:
+        if isinstance(question, (Question, PageBreak)):
+            yield question
+            continue
+        try:
+            yield Question(*question)
+        except ValueError as e:
+            print(f"Warning: Skipping invalid question '{question[0]}': {e}")
+
+# Encoded createItem for a question: head + location index + tail
+_CREATE_ITEM_HEAD = '{"createItem":{"item":'
+_CREATE_ITEM_LOCATION = ',"location":{"index":'
+_CREATE_ITEM_TAIL = '}}}'
+_INDEX_DIGITS_RESERVED = 7 # Room left for the location index when sizing chunks
+_BATCH_BODY_HEAD = '{"requests":['
+_BATCH_BODY_TAIL = ']}'
+
+def _encode_request(request):
+    """
+    Encodes one request as compact JSON, ready to be joined into a batchUpdate body.
+    A Question or PageBreak becomes a (head, tail) pair so that its location index
+    can be filled in when the chunk is sent; any other request (a dict) is encoded verbatim.
+    """
+    if isinstance(request, (Question, PageBreak)):
+        return (_CREATE_ITEM_HEAD + request.item_json() + _CREATE_ITEM_LOCATION, _CREATE_ITEM_TAIL)
+    return json.dumps(request, separators=(',', ':'))
+
+def _encoded_size(part):
+    """Bytes an encoded request takes in the body (encoded JSON is ASCII-only)."""
+    if isinstance(part, str):
+        return len(part)
+    return len(part[0]) + len(part[1]) + _INDEX_DIGITS_RESERVED
+
+def _encode_batch_body(parts, first_index):
+    """
+    Joins encoded requests into a batchUpdate body, numbering question items
+    from first_index. Returns (body_text, items_created_by_body), counting
+    verbatim createItem requests as well as questions.
+    """
+    pieces = []
+    index = first_index
+    verbatim_creates = 0
+    for part in parts:
+        if isinstance(part, str):
+            pieces.append(part)
+            verbatim_creates += part.startswith(_CREATE_ITEM_HEAD)
+        else:
+            pieces.append(part[0] + str(index) + part[1])
+            index += 1
+    return _BATCH_BODY_HEAD + ','.join(pieces) + _BATCH_BODY_TAIL, index - first_index + verbatim_creates
+
+def _batch_update_request(service, form_id, body_text):
+    """
+    Prepares a batchUpdate whose body is already-encoded JSON text, so the
+    client library does not build and re-serialise one big nested dict.
+    """
+    api_request = service.forms().batchUpdate(formId=form_id, body={})
+    api_request.body = body_text
+    api_request.body_size = len(body_text)
+    return api_request
+
+def _chunk_requests(requests_iter, max_items=None, max_bytes=None, sizer=None, pre_encoded=False):
+    """
+    Encodes requests and groups them into chunks that stay within max_items
+    requests and max_bytes of body (defaults: MAX_ITEMS_PER_BATCH, MAX_BATCH_BYTES).
+    With a sizer (AdaptiveBatchSize), the limits are read from it afresh for
+    every chunk instead. pre_encoded requests are parts from _encode_request.
+    Yields (encoded_parts, chunk_bytes, max_items) tuples lazily, max_items
+    being the item limit the chunk was built with.
+    A single request bigger than max_bytes is sent in a chunk of its own.
+    """
+    max_items = max_items or MAX_ITEMS_PER_BATCH
+    max_bytes = max_bytes or MAX_BATCH_BYTES
+    if sizer is not None:
+        max_items, max_bytes = sizer.limits()
+    envelope_bytes = len(_BATCH_BODY_HEAD) + len(_BATCH_BODY_TAIL)
+    chunk, chunk_bytes = [], envelope_bytes
+    for request in requests_iter:
+        part = request if pre_encoded else _encode_request(request)
+        size = _encoded_size(part)
+        separator = 1 if chunk else 0 # Comma between requests
+        if chunk and (len(chunk) >= max_items or chunk_bytes + separator + size > max_bytes):
+            yield chunk, chunk_bytes, max_items
+            chunk, chunk_bytes, separator = [], envelope_bytes, 0
+            if sizer is not None:
+                max_items, max_bytes = sizer.limits() # Adjusted by the chunk just sent
+        if size + envelope_bytes > max_bytes:
+            print(f"Warning: A single request is {size} bytes, above the {max_bytes} byte batch limit.")
+        chunk.append(part)
+        chunk_bytes += separator + size
+    if chunk:
+        yield chunk, chunk_bytes, max_items
+
+def _run_batches(service, form_id, requests_iter, start_index=0, leading_requests=None, responder_uri=None,
+                 on_chunk_done=None):
+    """
+    Sends requests to a form as a series of size-limited batchUpdate calls.
+    Questions are appended in order after start_index, their location being
+    numbered per chunk whatever was skipped or sent before; other requests
+    (dicts) are sent verbatim. leading_requests (e.g. the quiz settings) ride
+    along at the front of the first chunk; if that chunk fails they are retried
+    on their own so their failure can be told apart.
+    Stops at the first failed chunk. on_chunk_done(items_added, leading_success)
+    is called after every chunk that lands.
+    With batch_sizer set, chunk sizes follow its limits, and a chunk rejected as
+    too large or too slow is sent again in smaller pieces instead of failing.
+    Returns (success, items_added, leading_success) where items_added counts created items.
+    """
+    leading_requests = leading_requests or []
+    leading_success = not leading_requests
+    items_added = 0
+    sizer = batch_sizer
+    all_requests = itertools.chain(leading_requests, requests_iter)
+    for chunk_number, (parts, _, limit) in enumerate(_chunk_requests(all_requests, sizer=sizer), start=1):
+        body_text, chunk_items = _encode_batch_body(parts, start_index + items_added)
+        try:
+            # For debugging the request payload if issues persist:
+            # print("---- BEGINNING OF QUESTION REQUEST BODY ----")
+            # print(json.dumps(json.loads(body_text), indent=2))
+            # print("---- END OF QUESTION REQUEST BODY ----")
+
+            _send_sized(service, form_id, body_text, len(parts), chunk_items, sizer, limit, chunk=chunk_number)
+            if chunk_number == 1 and leading_requests:
+                leading_success = True
+                print(f"Form '{form_id}' settings applied together with the first chunk.")
+        except HttpError as e:
+            print(f"Error sending chunk {chunk_number} ({len(parts)} requests, {len(body_text)} bytes) to form '{form_id}': {e}")
+            if sizer is not None and _is_size_error(e) and len(parts) > 1:
+                parts_sent, items_created = _resend_smaller(service, form_id, parts, start_index + items_added, sizer)
+                items_added += items_created
+                if chunk_number == 1 and parts_sent >= len(leading_requests) > 0:
+                    leading_success = True
+                if parts_sent == len(parts):
+                    print(f"Chunk {chunk_number}: {len(parts)} requests sent in smaller pieces, {items_created} items created.")
+                    if on_chunk_done:
+                        on_chunk_done(items_added, leading_success)
+                    continue
+                if items_created and on_chunk_done:
+                    on_chunk_done(items_added, leading_success)
+                print(f"{items_added} items were added before the error.")
+                return False, items_added, leading_success
+            if chunk_number == 1 and leading_requests:
+                # batchUpdate is all-or-nothing, so retry the parts separately to see which one failed
+                print("Retrying the quiz settings and the first chunk of questions separately...")
+                leading_success = _set_form_as_quiz(service, form_id, responder_uri)
+                remaining = parts[len(leading_requests):]
+                if not remaining or _send_batch(service, form_id, remaining, start_index + items_added):
+                    items_added += chunk_items
+                    print(f"Chunk {chunk_number}: {len(remaining)} requests sent, {chunk_items} items created.")
+                    if on_chunk_done:
+                        on_chunk_done(items_added, leading_success)
+                    continue
+            if items_added:
+                print(f"{items_added} items from earlier chunks were added before the error.")
+            return False, items_added, leading_success
+        items_added += chunk_items
+        print(f"Chunk {chunk_number}: {len(parts)} requests sent, {chunk_items} items created ({len(body_text)} bytes).")
+        if on_chunk_done:
+            on_chunk_done(items_added, leading_success)
+    return True, items_added, leading_success
+
+def _send_sized(service, form_id, body_text, requests, items, sizer, limit, **stage_fields):
+    """
+    Sends one batchUpdate body and, with a sizer, reports how it went (time of
+    the final attempt, congestion retries or the error) together with the item
+    limit the chunk was built with, so the next chunk can be sized accordingly.
+    Raises the HttpError of a failed call.
+    """
+    try:
+        with _stage("batch", requests=requests, items=items, **stage_fields):
+            _execute(_batch_update_request(service, form_id, body_text))
+    except HttpError as e:
+        if sizer is not None:
+            sizer.observe(requests, len(body_text), None, limit, error=e)
+        raise
+    if sizer is not None:
+        seconds, retries = _thread_state.last_call
+        sizer.observe(requests, len(body_text), seconds, limit, retries)
+
+def _resend_smaller(service, form_id, parts, first_index, sizer):
+    """
+    Sends the encoded parts of a chunk that failed as too large or too slow
+    again, split at the sizer's (by now lower) limits, or in half if those
+    still fit it whole; pieces failing the same way are split further. Stops
+    at the first piece that cannot be sent. Returns (parts_sent, items_created).
+    """
+    parts_sent = items_created = 0
+    pieces = _chunk_requests(parts, sizer=sizer, pre_encoded=True)
+    first = next(pieces)
+    if len(first[0]) == len(parts):
+        half = (len(parts) + 1) // 2
+        pieces = iter([(parts[:half], None, first[2]), (parts[half:], None, first[2])])
+    else:
+        pieces = itertools.chain([first], pieces)
+    for piece, _, limit in pieces:
+        body_text, piece_items = _encode_batch_body(piece, first_index + items_created)
+        try:
+            _send_sized(service, form_id, body_text, len(piece), piece_items, sizer, limit)
+        except HttpError as e:
+            print(f"Error sending {len(piece)} requests ({len(body_text)} bytes) to form '{form_id}': {e}")
+            if not _is_size_error(e) or len(piece) == 1:
+                return parts_sent, items_created
+            more_sent, more_created = _resend_smaller(service, form_id, piece, first_index + items_created, sizer)
+            parts_sent += more_sent
+            items_created += more_created
+            if more_sent < len(piece):
+                return parts_sent, items_created
+            continue
+        parts_sent += len(piece)
+        items_created += piece_items
+    return parts_sent, items_created
+
+def _send_batch(service, form_id, parts, first_index):
+    """Sends one batchUpdate of encoded requests, printing the error if it fails. Returns True on success."""
+    body_text, chunk_items = _encode_batch_body(parts, first_index)
+    try:
+        with _stage("batch", requests=len(parts), items=chunk_items):
+            _execute(_batch_update_request(service, form_id, body_text))
+        return True
+    except HttpError as e:
+        print(f"Error sending batch of {len(parts)} requests to form '{form_id}': {e}")
+        return False
+
+def _item_to_question(item):
+    """
+    Reads a form item back into a Question, or None if it is not a RADIO
+    question. An ungraded or answer-less one gives a Question with
+    correct_index None and 0 points, which never equals a bank question but
+    can still be updated in place.
+    """
+    question = item.get('questionItem', {}).get('question', {})
+    choice = question.get('choiceQuestion')
+    if not choice or choice.get('type') != 'RADIO':
+        return None
+    options = [option.get('value', '') for option in choice.get('options', [])]
+    grading = question.get('grading', {})
+    answers = grading.get('correctAnswers', {}).get('answers', [])
+    correct_value = answers[0].get('value') if answers else None
+    try:
+        return Question(item.get('title', ''), options,
+                        options.index(correct_value) if correct_value in options else -1,
+                        grading.get('pointValue', 0))
+    except ValueError:
+        unkeyed = Question.__new__(Question) # Skips validation, which requires an answer key
+        unkeyed.text, unkeyed.options, unkeyed.correct_index, unkeyed.points = (
+            item.get('title', ''), tuple(options), None, 0)
+        return unkeyed
+
+def _longest_increasing_run(positions):
+    """Returns the set of indexes into positions forming a longest strictly increasing subsequence."""
+    tails, tail_indexes, previous = [], [], [None] * len(positions)
+    for index, position in enumerate(positions):
+        slot = bisect.bisect_left(tails, position)
+        if slot == len(tails):
+            tails.append(position)
+            tail_indexes.append(index)
+        else:
+            tails[slot] = position
+            tail_indexes[slot] = index
+        previous[index] = tail_indexes[slot - 1] if slot else None
+    keep = set()
+    index = tail_indexes[-1] if tail_indexes else None
+    while index is not None:
+        keep.add(index)
+        index = previous[index]
+    return keep
+
+class _SlotCounter:
+    """Fenwick tree counting the occupied slots below a slot, with slots filled and emptied in O(log n)."""
+    def __init__(self, size, occupied_slots):
+        self.tree = [0] * (size + 1)
+        for slot in occupied_slots:
+            self.tree[slot + 1] += 1
+        for index in range(1, size + 1): # Linear-time build
+            parent = index + (index & -index)
+            if parent <= size:
+                self.tree[parent] += self.tree[index]
+
+    def add(self, slot, delta):
+        index = slot + 1
+        while index < len(self.tree):
+            self.tree[index] += delta
+            index += index & -index
+
+    def count_before(self, slot):
+        total, index = 0, slot
+        while index > 0:
+            total += self.tree[index]
+            index -= index & -index
+        return total
+
+def _plan_sync(form, questions):
+    """
+    Diffs a form (as returned by forms().get) against a list of Questions and
+    returns (requests, counts). Items are matched by content first, then by
+    title, then by options and answer, then by position between the items
+    matched so far; all but the first become an updateItem, which keeps the
+    item's ID and responses. Unmatched items are deleted and unmatched
+    questions created. Only items outside the longest run already in
+    the right relative order are moved, so the request count follows the
+    number of changes rather than the size of the bank. Items that are not
+    graded RADIO questions are removed, since the bank cannot describe them.
+    """
+    remote_items = form.get('items', [])
+    remote_questions = [_item_to_question(item) for item in remote_items]
+    by_content, by_title = {}, {}
+    for index, question in enumerate(remote_questions):
+        if question is not None:
+            by_content.setdefault(tuple(map(_hashable, question)), collections.deque()).append(index)
+
+    matches = [None] * len(questions) # Remote index matched to each local question
+    needs_update = [False] * len(questions)
+    claimed = set()
+    for local_index, question in enumerate(questions):
+        candidates = by_content.get(tuple(map(_hashable, question)))
+        if candidates:
+            matches[local_index] = candidates.popleft()
+            claimed.add(matches[local_index])
+    for index, question in enumerate(remote_questions):
+        if question is not None and index not in claimed:
+            by_title.setdefault(question.text, collections.deque()).append(index)
+    for local_index, question in enumerate(questions):
+        candidates = by_title.get(question.text)
+        if matches[local_index] is None and candidates:
+            matches[local_index] = candidates.popleft()
+            needs_update[local_index] = True
+            claimed.add(matches[local_index])
+    by_answer_key = {} # An edited title with the same options and answer
+    for index, question in enumerate(remote_questions):
+        if question is not None and index not in claimed:
+            key = (question.options, question.correct_index, question.points)
+            by_answer_key.setdefault(key, collections.deque()).append(index)
+    for local_index, question in enumerate(questions):
+        candidates = by_answer_key.get((question.options, question.correct_index, question.points))
+        if matches[local_index] is None and candidates:
+            matches[local_index] = candidates.popleft()
+            needs_update[local_index] = True
+            claimed.add(matches[local_index])
+    # Whatever is left is paired up in order within each gap between matched
+    # items, so an item edited beyond recognition is still updated in place
+    by_gap = {} # Remote index of the matched item before the gap (-1 at the top) -> unmatched indexes
+    previous_match = -1
+    for index, question in enumerate(remote_questions):
+        if index in claimed:
+            previous_match = index
+        elif question is not None:
+            by_gap.setdefault(previous_match, collections.deque()).append(index)
+    previous_match = -1
+    for local_index in range(len(questions)):
+        if matches[local_index] is not None:
+            previous_match = matches[local_index]
+            continue
+        candidates = by_gap.get(previous_match)
+        if candidates:
+            matches[local_index] = candidates.popleft()
+            needs_update[local_index] = True
+            claimed.add(matches[local_index])
+
+    requests = []
+    deleted = sorted(set(range(len(remote_items))) - claimed, reverse=True)
+    for index in deleted: # Highest index first so earlier indexes stay valid
+        requests.append({"deleteItem": {"location": {"index": index}}})
+    current = [index for index in range(len(remote_items)) if index in claimed]
+
+    matched_locals = [local_index for local_index, remote_index in enumerate(matches) if remote_index is not None]
+    order_in_form = {remote_index: position for position, remote_index in enumerate(current)}
+    stable = _longest_increasing_run([order_in_form[matches[local_index]] for local_index in matched_locals])
+    stable_locals = {matched_locals[position] for position in stable}
+
+    # Questions outside the stable run end up right after the stable item before
+    # them (or at the top), so each gets a slot key (stable item's position, n-th
+    # after it) that sorts in list order. A Fenwick tree over the slots gives any
+    # item's current index in O(log n), so only the changes cost anything.
+    slot_keys = []
+    anchor, after_anchor = -1, 0
+    for local_index in range(len(questions)):
+        if local_index in stable_locals:
+            anchor, after_anchor = order_in_form[matches[local_index]], 0
+        else:
+            after_anchor += 1
+        slot_keys.append((anchor, after_anchor))
+    slots = {key: rank for rank, key in enumerate(sorted(set(slot_keys).union(
+        (position, 0) for position in range(len(current)))))}
+    occupied = _SlotCounter(len(slots), [slots[(position, 0)] for position in range(len(current))])
+
+    created = moved = 0
+    for local_index, question in enumerate(questions):
+        if local_index in stable_locals:
+            continue
+        remote_index = matches[local_index]
+        slot = slots[slot_keys[local_index]]
+        if remote_index is None:
+            target = occupied.count_before(slot)
+            requests.append({"createItem": {"item": question.item(), "location": {"index": target}}})
+            created += 1
+        else:
+            origin_slot = slots[(order_in_form[remote_index], 0)]
+            origin = occupied.count_before(origin_slot)
+            occupied.add(origin_slot, -1)
+            target = occupied.count_before(slot)
+            if origin != target:
+                requests.append({"moveItem": {"originalLocation": {"index": origin},
+                                              "newLocation": {"index": target}}})
+                moved += 1
+        occupied.add(slot, 1)
+
+    updated = 0
+    for local_index, question in enumerate(questions):
+        if not needs_update[local_index]:
+            continue
+        remote_item = remote_items[matches[local_index]]
+        item = question.item()
+        item['itemId'] = remote_item['itemId']
+        question_id = remote_item.get('questionItem', {}).get('question', {}).get('questionId')
+        if question_id:
+            item['questionItem']['question']['questionId'] = question_id
+        requests.append({"updateItem": {"item": item, "location": {"index": local_index},
+                                        "updateMask": "title,questionItem"}})
+        updated += 1
+
+    counts = {"kept": len(questions) - created - updated, "updated": updated,
+              "created": created, "deleted": len(deleted), "moved": moved}
+    return requests, counts
+
+def _hashable(value):
+    return tuple(value) if isinstance(value, list) else value
+
+@_timed_stage("sync", succeeded=bool)
+def sync_questions_to_form(service, form_id, questions):
     """
-    Creates a basic form and then configures it as a quiz.
-    Returns (form_id, responder_uri, quiz_setup_success_boolean).
-    quiz_setup_success_boolean is True if quiz setting succeeded, False otherwise.
-    form_id and responder_uri will be None if form creation itself fails.
+    Makes an existing form match a question bank with the fewest requests:
+    one forms().get, then only the needed update/delete/move/create requests,
+    sent through the same chunked batchUpdate path as new forms.
+    Returns True on success.
     """
-    print(f"Creating form with title: '{form_title}'...")
-    form_id_created = None
-    responder_uri_created = None
+    print(f"Reading form '{form_id}'...")
     try:
-        form_body = {
-            "info": {
-                "title": form_title,
-                "documentTitle": document_title
-            }
-        }
-        created_form_result = service.forms().create(body=form_body).execute()
-        form_id_created = created_form_result['formId']
-        responder_uri_created = created_form_result['responderUri']
-        print(f"Form scaffold created successfully. Form ID: {form_id_created}")
+        form = _execute(service.forms().get(formId=form_id))
     except HttpError as e:
-        print(f"Error creating form scaffold: {e}. Check API permissions and quota.")
-        return None, None, False # Form creation failed
+        print(f"Error reading form '{form_id}': {e}")
+        return False
+    requests, counts = _plan_sync(form, questions)
+    if not form.get('settings', {}).get('quizSettings', {}).get('isQuiz', False):
+        requests.insert(0, _quiz_settings_request())
+    print(f"Sync plan: {counts['kept']} kept, {counts['updated']} updated, {counts['created']} created, "
+          f"{counts['deleted']} deleted, {counts['moved']} moved ({len(requests)} requests).")
+    if not requests:
+        print("The form already matches the question bank.")
+        return True
+    success, _, _ = _run_batches(service, form_id, iter(requests))
+    if success:
+        print(f"Form '{form_id}' is now in sync with the question bank.")
+    return success
 
-    print(f"Configuring form '{form_id_created}' as a quiz...")
+def _coerce_int(value):
+    """Converts text values from CSV/YAML cells to int, leaving anything else untouched."""
+    if isinstance(value, str):
+        return int(value.strip())
+    return value
+
+def _question_from_record(record, options_are_packed=False):
+    """
+    Turns one imported record (a dict with IMPORT_FIELDS keys) into a Question.
+    Raises ValueError with a readable message if the record is malformed.
+    """
+    if not isinstance(record, dict):
+        raise ValueError("row must be an object with question, options, correct_index and points")
+    missing = [field for field in IMPORT_FIELDS if record.get(field) in (None, '')]
+    if missing:
+        raise ValueError(f"missing field(s): {', '.join(missing)}")
+
+    options_list = record['options']
+    if options_are_packed and isinstance(options_list, str):
+        options_list = [option.strip() for option in options_list.split(CSV_OPTION_SEPARATOR)]
+    if isinstance(options_list, list):
+        # Numeric options (e.g. [1, 2, 3] in JSON) become their text; anything else is left to validation
+        options_list = [str(option) if isinstance(option, (int, float)) and not isinstance(option, bool) else option
+                        for option in options_list]
     try:
-        quiz_setting_body = {
-            "requests": [
-                {
-                    "updateSettings": {
-                        "settings": {"quizSettings": {"isQuiz": True}},
-                        "updateMask": "quizSettings" # Broader mask as specified
-                    }
-                }
-            ]
-        }
-        service.forms().batchUpdate(
-            formId=form_id_created,
-            body=quiz_setting_body
-        ).execute()
-        print(f"Form '{form_id_created}' successfully configured as a quiz.")
-        return form_id_created, responder_uri_created, True # Both steps succeeded
-    except HttpError as e:
-        print(f"Error updating form settings to quiz for form ID {form_id_created}: {e}")
-        print(f"The form was created (ID: {form_id_created}, URI: {responder_uri_created}), but could not be set as a quiz.")
-        return form_id_created, responder_uri_created, False # Quiz setup failed
-
-def _add_questions_to_form(service, form_id, questions_data):
-    """Adds questions to the specified form."""
-    if not questions_data:
-        print("No questions data provided to add.")
-        return True # Not a failure of this specific function
-
-    print(f"Adding {len(questions_data)} questions to form '{form_id}'...")
-    all_question_requests_list = []
-    for i, (question_text, options_list, correct_option_index, points_value) in enumerate(questions_data):
-        # Basic validation for question data (can be expanded)
-        if not all([isinstance(question_text, str),
-                    isinstance(options_list, list) and len(options_list) >= 2,
-                    isinstance(correct_option_index, int) and 0 <= correct_option_index < len(options_list),
-                    isinstance(points_value, int) and points_value > 0]):
-            print(f"Warning: Skipping invalid question data format: Q: '{question_text}', Options: {len(options_list)}, Correct Idx: {correct_option_index}, Points: {points_value}")
-            continue
+        correct_option_index = _coerce_int(record['correct_index'])
+        points_value = _coerce_int(record['points'])
+    except ValueError:
+        raise ValueError("correct_index and points must be whole numbers")
 
-        request = {
-            "createItem": {
-                "item": {
-                    "title": question_text,
-                    "questionItem": {
-                        "question": {
-                            "required": True,
-                            "choiceQuestion": {
-                                "type": "RADIO",
-                                "options": [{"value": option_text} for option_text in options_list],
-                                "shuffle": True
-                            },
-                            "grading": { # This section is crucial for quiz questions
-                                "pointValue": points_value,
-                                "correctAnswers": {
-                                    "answers": [{"value": options_list[correct_option_index]}]
-                                }
-                            }
-                        }
-                    }
-                },
-                "location": {"index": i} # i is the loop index
-            }
-        }
-        all_question_requests_list.append(request)
+    return Question(record['question'], options_list, correct_option_index, points_value)
 
-    if not all_question_requests_list:
-        print("No valid questions to add after data validation.")
-        return False # Considered a failure if no valid questions were processed
+def _iter_csv_records(stream):
+    """Yields (line_number, record) from a CSV file with a header row."""
+    reader = csv.DictReader(stream)
+    for record in reader:
+        yield reader.line_num, record
+
+def _iter_jsonl_records(stream):
+    """Yields (line_number, record) from a JSON Lines file, one question object per line."""
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_number, ValueError(f"invalid JSON: {e.msg}")
+
+def _iter_yaml_records(stream):
+    """
+    Yields (line_number, record) from a YAML file.
+    Each document may be a single question mapping or a list of them; documents
+    are parsed one at a time, so multi-document files stream.
+    """
+    import yaml # Availability is checked up front by iter_questions_from_file
 
+    loader = yaml.SafeLoader(stream)
     try:
-        # For debugging the request payload if issues persist:
-        # print("---- BEGINNING OF QUESTION REQUEST BODY ----")
-        # print(json.dumps({"requests": all_question_requests_list}, indent=2))
-        # print("---- END OF QUESTION REQUEST BODY ----")
+        while loader.check_node():
+            node = loader.get_node()
+            children = node.value if isinstance(node, yaml.SequenceNode) else [node]
+            for child in children:
+                yield child.start_mark.line + 1, loader.construct_object(child, deep=True)
+    except yaml.YAMLError as e:
+        mark = getattr(e, 'problem_mark', None)
+        yield (mark.line + 1 if mark else 0), ValueError(f"invalid YAML: {e}")
+    finally:
+        loader.dispose()
 
-        service.forms().batchUpdate(
-            formId=form_id,
-            body={"requests": all_question_requests_list}
-        ).execute()
-        print("Questions added successfully to the form!")
-        return True
-    except HttpError as e:
-        print(f"Error adding questions to form '{form_id}': {e}")
-        # Potentially print the JSON payload that caused the error for detailed debugging
-        # print("Failed request body for adding questions was:")
-        # print(json.dumps({"requests": all_question_requests_list}, indent=2))
-        return False
+def _detect_import_format(path):
+    """Guesses the import format from the file extension."""
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    if extension in ('yml', 'yaml'):
+        return 'yaml'
+    if extension in ('jsonl', 'ndjson'):
+        return 'jsonl'
+    if extension == 'csv':
+        return 'csv'
+    return None
+
+def iter_questions_from_file(path, import_format=None, stats=None, report_errors=True):
+    """
+    Lazily reads questions from a CSV, JSONL or YAML file ('-' reads stdin).
+    Returns an iterator of validated Questions; invalid rows are reported with
+    their line number (unless report_errors is False) and counted in stats
+    ({'valid': n, 'invalid': n}).
+    The file is opened right away, so a missing file fails before any form is created.
+    """
+    import_format = import_format or _detect_import_format(path)
+    if import_format not in IMPORT_FORMATS:
+        raise ValueError(f"Cannot tell the format of '{path}'. Use one of: {', '.join(IMPORT_FORMATS)}.")
+    if import_format == 'yaml':
+        try:
+            import yaml # noqa: F401 -- optional dependency, only needed for YAML banks
+        except ImportError:
+            raise RuntimeError("YAML import needs PyYAML. Install it with: pip install pyyaml")
+    if stats is None:
+        stats = {}
+    stats.setdefault('valid', 0)
+    stats.setdefault('invalid', 0)
+
+    stream = sys.stdin if path == '-' else open(path, 'r', encoding='utf-8', newline='')
+    return _iter_questions_from_stream(stream, import_format, stats, report_errors)
+
+def _iter_questions_from_stream(stream, import_format, stats, report_errors):
+    readers = {'csv': _iter_csv_records, 'jsonl': _iter_jsonl_records, 'yaml': _iter_yaml_records}
+    try:
+        for line_number, record in readers[import_format](stream):
+            try:
+                if isinstance(record, Exception):
+                    raise record
+                question = _question_from_record(record, options_are_packed=(import_format == 'csv'))
+            except ValueError as e:
+                stats['invalid'] += 1
+                if report_errors:
+                    print(f"Line {line_number}: {e}")
+                continue
+            stats['valid'] += 1
+            yield question
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
 
 def main_logic():
     """Main logic for the Google Forms quiz creator script."""
@@ -241,25 +2070,20 @@ def main_logic():
         print("No questions were added. Exiting script.")
         return
 
-    print("\nBuilding Google Forms service...")
-    service = None
-    try:
-        service = build('forms', 'v1', credentials=creds)
-    except Exception as e: # Catch errors during service build
-        print(f"Failed to build Google Forms API service: {e}")
+    service = _build_service(creds)
+    if service is None:
         return
 
-    form_id, responder_uri, quiz_setup_success = _create_form_and_set_quiz(service, form_title, document_title)
+    print(f"Adding {len(user_questions)} questions...")
+    form_id, responder_uri, quiz_setup_success, questions_added_successfully = _provision_quiz_form(
+        service, form_title, document_title, user_questions)
 
     if form_id is None:
         print("Form creation failed. Cannot proceed. Exiting.")
         return
 
     if not quiz_setup_success:
-        print("Warning: Form was created, but failed to be configured as a quiz. Proceeding to add questions...")
-        # Continue to add questions as form_id is valid
-
-    questions_added_successfully = _add_questions_to_form(service, form_id, user_questions)
+        print("Warning: Form was created, but failed to be configured as a quiz.")
 
     if questions_added_successfully:
         print("\n--- Form Processing Completed ---")
@@ -277,6 +2101,1458 @@ def main_logic():
         else:
             print(f"The form (ID: {form_id}) was created but may be partially configured.")
 
+def _form_cache(args):
+    """The FormCache configured on the command line, or None with --no-cache."""
+    if args.no_cache:
+        return None
+    return FormCache(args.cache_file, args.cache_ttl_days * 86400)
+
+def import_logic(args):
+    """Non-interactive mode: creates a quiz from a question bank file instead of input() prompts."""
+    document_title = args.document_title or args.title
+    stats = {}
+    try:
+        questions = iter_questions_from_file(args.import_file, args.format, stats)
+        first_question = next(questions, None) # Validate the file before creating an empty form
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"Cannot read question bank: {e}")
+        return
+    if first_question is None:
+        print(f"No valid questions found in '{args.import_file}' ({stats['invalid']} invalid rows). Exiting script.")
+        return
+
+    cache = _form_cache(args) if args.import_file != '-' else None # stdin cannot be read twice
+    cache_key = None
+    if cache:
+        cache_key = _content_key(args.title, document_title,
+                                 iter_questions_from_file(args.import_file, args.format, report_errors=False))
+        cached = None if args.refresh_cache else cache.lookup(cache_key)
+        if cached:
+            print("\n--- Import Summary ---")
+            print("An identical quiz was already created; no API calls were made (use --refresh-cache to recreate it).")
+            print(f"Form URI: {cached['responder_uri']}" if cached['responder_uri'] else f"Form ID: {cached['form_id']}")
+            cache.flush()
+            return
+
+    creds = authenticate()
+    if not creds:
+        print("Exiting script due to authentication failure.")
+        return
+
+    service = _build_service(creds)
+    if service is None:
+        return
+
+    journal = None if args.no_journal else ProvisioningJournal(args.journal)
+    job_key = _job_key(args.title, document_title, args.import_file) if journal else None
+    form_id, responder_uri, quiz_setup_success, questions_added_successfully = _provision_quiz_form(
+        service, args.title, document_title, _chain_first(first_question, questions), journal, job_key)
+    if form_id is None:
+        print("Form creation failed. Cannot proceed. Exiting.")
+        return
+    if cache and quiz_setup_success and questions_added_successfully:
+        cache.store(cache_key, form_id, responder_uri, args.title)
+
+    print("\n--- Import Summary ---")
+    print(f"Form URI: {responder_uri}" if responder_uri else f"Form ID: {form_id}")
+    print(f"Quiz setup success: {quiz_setup_success}")
+    print(f"Valid rows: {stats['valid']}, invalid rows: {stats['invalid']}")
+    print(_retry_summary())
+    print("Questions added successfully." if questions_added_successfully else "Failed to add questions. The form may be partially configured.")
+
+def sync_logic(args):
+    """Sync mode: applies only the changes between a question bank and an existing form."""
+    stats = {}
+    try:
+        questions = list(iter_questions_from_file(args.import_file, args.format, stats))
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"Cannot read question bank: {e}")
+        return
+    if stats['invalid']:
+        print(f"{stats['invalid']} invalid rows must be fixed before syncing, or the form would lose those questions.")
+        return
+
+    creds = authenticate()
+    if not creds:
+        print("Exiting script due to authentication failure.")
+        return
+    service = _build_service(creds)
+    if service is None:
+        return
+
+    synced = sync_questions_to_form(service, args.sync, questions)
+    print("\n--- Sync Summary ---")
+    print(f"Form ID: {args.sync}")
+    print(_retry_summary())
+    print("Sync completed." if synced else "Sync failed. The form may be partially updated; rerun the sync to finish it.")
+
+def compile_plan(plan_file, form_title, document_title, questions, source=None):
+    """
+    Writes the request plan of one quiz form to plan_file (opened in binary mode):
+    a header line, then per batchUpdate call a metadata line followed by the
+    call's body exactly as it will be sent (compact ASCII JSON, one line, the
+    first one carrying the quiz settings), and an "end" line with the totals.
+    questions are read as a stream, so only one chunk is held in memory.
+    Returns (header, chunk_metadata_list, end_record).
+    """
+    header = {"plan": PLAN_FORMAT, "title": form_title, "document_title": document_title,
+              "quiz_settings_first": True, "max_items": MAX_ITEMS_PER_BATCH, "max_bytes": MAX_BATCH_BYTES,
+              "source": source, "compiled_at": time.time()}
+    plan_file.write(json.dumps(header).encode('utf-8') + b'\n')
+    chunks = []
+    items = 0
+    all_requests = itertools.chain([_quiz_settings_request()], _valid_question_requests(questions))
+    for number, (parts, _, _) in enumerate(_chunk_requests(all_requests), start=1):
+        body_text, chunk_items = _encode_batch_body(parts, items)
+        meta = {"chunk": number, "requests": len(parts), "items": chunk_items, "first_index": items,
+                "bytes": len(body_text)}
+        plan_file.write(json.dumps(meta).encode('utf-8') + b'\n')
+        plan_file.write(body_text.encode('ascii') + b'\n')
+        chunks.append(meta)
+        items += chunk_items
+    end = {"end": True, "chunks": len(chunks), "items": items, "bytes": sum(meta["bytes"] for meta in chunks)}
+    plan_file.write(json.dumps(end).encode('utf-8') + b'\n')
+    return header, chunks, end
+
+class RequestPlan:
+    """
+    A compiled plan opened for replay. The file is memory-mapped and only the
+    small metadata lines are parsed; the batchUpdate bodies are sliced out of
+    the map when they are sent, never decoded as JSON.
+    """
+    def __init__(self, path):
+        import mmap
+        self.path = path
+        self.file = open(path, 'rb')
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError: # An empty file cannot be mapped
+            self.file.close()
+            raise ValueError(f"'{path}' is empty, not a request plan")
+        self.header = None
+        self.chunks = [] # (metadata, body_start, body_end)
+        self.end = None
+        try:
+            self._index()
+        except ValueError:
+            self.close()
+            raise
+
+    def _lines(self):
+        position = 0
+        size = len(self.map)
+        while position < size:
+            end = self.map.find(b'\n', position)
+            end = size if end < 0 else end
+            yield position, end
+            position = end + 1
+
+    def _index(self):
+        lines = self._lines()
+        try:
+            start, end = next(lines)
+            self.header = json.loads(self.map[start:end])
+            if not isinstance(self.header, dict) or self.header.get("plan") != PLAN_FORMAT:
+                raise ValueError(f"'{self.path}' is not a version {PLAN_FORMAT} request plan")
+            for start, end in lines:
+                record = json.loads(self.map[start:end])
+                if record.get("end"):
+                    self.end = record
+                    break
+                body_start, body_end = next(lines)
+                if body_end - body_start != record["bytes"]:
+                    raise ValueError(f"chunk {record['chunk']} of '{self.path}' is damaged")
+                self.chunks.append((record, body_start, body_end))
+        except (StopIteration, KeyError, AttributeError, json.JSONDecodeError):
+            raise ValueError(f"'{self.path}' is not a complete request plan")
+        if self.end is None or self.end["chunks"] != len(self.chunks):
+            raise ValueError(f"'{self.path}' is truncated (no end record); compile it again")
+
+    def body(self, chunk_position):
+        """The body text of a chunk, as compiled."""
+        _, start, end = self.chunks[chunk_position]
+        return self.map[start:end].decode('ascii')
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+def _print_plan_report(header, chunks, end, label):
+    """Prints what uploading a plan costs: API calls, items and bytes per batchUpdate."""
+    print(f"\n--- Plan for '{header['title']}' ({label}) ---")
+    for meta in chunks:
+        print(f"  Chunk {meta['chunk']}: {meta['requests']} requests, {meta['items']} items, {meta['bytes']} bytes")
+    largest = max((meta["bytes"] for meta in chunks), default=0)
+    print(f"Items: {end['items']}")
+    print(f"API calls: {end['chunks'] + 1} (1 create + {end['chunks']} batchUpdate)")
+    print(f"Request bytes: {end['bytes']} ({end['bytes'] / 1024:.1f} KiB), largest call {largest} bytes "
+          f"(limit {header['max_bytes']})")
+
+def compile_logic(args):
+    """
+    Compile mode: validates the --import bank and writes its request plan to
+    --compile, or with --dry-run only reports the calls and bytes it would take.
+    No API calls either way.
+    """
+    document_title = args.document_title or args.title
+    stats = {}
+    plan_path = args.compile if args.compile else os.devnull
+    try:
+        questions = iter_questions_from_file(args.import_file, args.format, stats)
+        with open(plan_path, 'wb') as plan_file:
+            with _stage("compile"):
+                header, chunks, end = compile_plan(plan_file, args.title, document_title, questions,
+                                                   source=None if args.import_file == '-' else args.import_file)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"Cannot compile question bank: {e}")
+        return
+    if not end["items"]:
+        if args.compile:
+            os.remove(args.compile)
+        print(f"No valid questions found in '{args.import_file}' ({stats['invalid']} invalid rows). Nothing to compile.")
+        return
+    _print_plan_report(header, chunks, end, "dry run" if not args.compile else f"written to {args.compile}")
+    print(f"Valid rows: {stats['valid']}, invalid rows: {stats['invalid']}")
+
+@_timed_stage("provision", succeeded=lambda result: result[2] and result[3])
+def _replay_plan(service, plan, journal=None, job_key=None):
+    """
+    Uploads a compiled plan: forms().create, then each precompiled batchUpdate
+    body in order. Resumes a journaled job at its first unsent chunk. A failed
+    first chunk is retried as quiz settings and questions separately, as in
+    _provision_quiz_form. Returns (form_id, responder_uri, quiz_setup_success, questions_added_success).
+    """
+    header = plan.header
+    if journal is None or job_key is None:
+        journal = job_key = None
+    resume_state = journal.pending(job_key) if journal else None
+    if resume_state:
+        form_id, responder_uri = resume_state["form_id"], resume_state["responder_uri"]
+        _start_form_retry_budget()
+        items_done, quiz_done = _form_progress(service, form_id, resume_state)
+        print(f"Resuming form '{form_id}' from the journal: {items_done} items already added.")
+    else:
+        form_id, responder_uri = _create_form(service, header['title'], header['document_title'])
+        if form_id is None:
+            return None, None, False, False
+        if journal:
+            journal.record(job_key, "form_created", form_id=form_id, responder_uri=responder_uri)
+        items_done, quiz_done = 0, False
+
+    first_chunk = 0
+    while first_chunk < len(plan.chunks) and plan.chunks[first_chunk][0]["first_index"] < items_done:
+        first_chunk += 1
+    if first_chunk < len(plan.chunks) and plan.chunks[first_chunk][0]["first_index"] != items_done \
+            or first_chunk == len(plan.chunks) and items_done != plan.end["items"]:
+        print(f"Form '{form_id}' has {items_done} items, which does not match any chunk of the plan; "
+              "it was edited since. Replay it into a new form with --no-journal.")
+        return form_id, responder_uri, quiz_done, False
+    if first_chunk > 0 and not quiz_done:
+        quiz_done = _set_form_as_quiz(service, form_id, responder_uri)
+
+    quiz_setup_success = quiz_done
+    for position in range(first_chunk, len(plan.chunks)):
+        meta = plan.chunks[position][0]
+        body_text = plan.body(position)
+        try:
+            with _stage("batch", chunk=meta["chunk"], requests=meta["requests"], items=meta["items"]):
+                _execute(_batch_update_request(service, form_id, body_text))
+            if meta["chunk"] == 1:
+                quiz_setup_success = True
+        except HttpError as e:
+            print(f"Error sending chunk {meta['chunk']} ({meta['requests']} requests, {meta['bytes']} bytes) "
+                  f"to form '{form_id}': {e}")
+            if meta["chunk"] != 1 or not header.get("quiz_settings_first"):
+                return form_id, responder_uri, quiz_setup_success, False
+            print("Retrying the quiz settings and the first chunk of questions separately...")
+            quiz_setup_success = _set_form_as_quiz(service, form_id, responder_uri)
+            remaining = [json.dumps(request, separators=(',', ':')) for request in json.loads(body_text)["requests"][1:]]
+            if remaining and not _send_batch(service, form_id, remaining, meta["first_index"]):
+                return form_id, responder_uri, quiz_setup_success, False
+        print(f"Chunk {meta['chunk']}: {meta['requests']} requests sent, {meta['items']} items created "
+              f"({meta['bytes']} bytes).")
+        if journal:
+            if meta["chunk"] == 1 and quiz_setup_success:
+                journal.record(job_key, "quiz_set", form_id=form_id)
+            journal.record(job_key, "chunk_added", form_id=form_id, items_added=meta["first_index"] + meta["items"])
+    if journal:
+        journal.record(job_key, "completed", form_id=form_id)
+    print(f"{plan.end['items']} questions added successfully to the form!")
+    return form_id, responder_uri, quiz_setup_success, True
+
+def _new_plan_result(plan_path):
+    return {"plan": plan_path, "title": None, "form_id": None, "responder_uri": None,
+            "quiz_setup": False, "questions_added": False, "error": None}
+
+def _replay_plan_file(creds, plan_path, journal=None):
+    """Worker: uploads one plan file and returns its status record."""
+    result = _new_plan_result(plan_path)
+    try:
+        plan = RequestPlan(plan_path)
+    except (OSError, ValueError) as e:
+        result["error"] = str(e)
+        return result
+    try:
+        result["title"] = plan.header["title"]
+        service = _thread_service(creds)
+        if service is None:
+            result["error"] = "could not build the Forms service"
+            return result
+        job_key = _job_key(plan.header["title"], plan.header["document_title"], plan_path) if journal else None
+        with journal.claim(job_key) if job_key else contextlib.nullcontext():
+            form_id, responder_uri, quiz_setup_success, questions_added_successfully = _replay_plan(
+                service, plan, journal, job_key)
+    finally:
+        plan.close()
+    result.update(form_id=form_id, responder_uri=responder_uri,
+                  quiz_setup=quiz_setup_success, questions_added=questions_added_successfully)
+    if form_id is None:
+        result["error"] = "form creation failed"
+    return result
+
+def replay_logic(args):
+    """
+    Replay mode: uploads compiled plans, several at once with --workers. With
+    --dry-run, only reports what each plan would send.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    global write_rate_limiter, shared_http
+    if args.dry_run:
+        for plan_path in args.replay:
+            try:
+                plan = RequestPlan(plan_path)
+            except (OSError, ValueError) as e:
+                print(f"Cannot read plan: {e}")
+                continue
+            _print_plan_report(plan.header, [meta for meta, _, _ in plan.chunks], plan.end, f"{plan_path}, dry run")
+            plan.close()
+        return
+
+    creds = authenticate(background_refresh=len(args.replay) > 1)
+    if not creds:
+        print("Exiting script due to authentication failure.")
+        return
+    write_rate_limiter = TokenBucket(args.writes_per_minute)
+    if args.transport == 'pooled' and len(args.replay) > 1:
+        shared_http = _pooled_http(creds, args.workers)
+    journal = None if args.no_journal else ProvisioningJournal(args.journal)
+    started_at = time.monotonic()
+    results = []
+    with ThreadPoolExecutor(max_workers=min(args.workers, len(args.replay))) as pool:
+        futures = [pool.submit(_replay_plan_file, creds, plan_path, journal) for plan_path in args.replay]
+        for plan_path, future in zip(args.replay, futures):
+            try:
+                results.append(future.result())
+            except Exception as e: # An unexpected error fails its plan, not the whole run
+                result = _new_plan_result(plan_path)
+                result["error"] = f"unexpected error: {type(e).__name__}: {e}"
+                results.append(result)
+    if shared_http is not None:
+        shared_http.close()
+        shared_http = None
+
+    print(f"\n--- Replay Summary ({time.monotonic() - started_at:.1f}s) ---")
+    for result in results:
+        print(f"{result['plan']}: created {_status_word(result['form_id'])}, quiz setup {_status_word(result['quiz_setup'])}, "
+              f"questions {_status_word(result['questions_added'])}"
+              + (f" -> {result['responder_uri']}" if result['responder_uri'] else "")
+              + (f" ({result['error']})" if result['error'] else ""))
+    print(_retry_summary())
+    if credential_manager is not None:
+        credential_manager.stop()
+    if args.results_out:
+        with open(args.results_out, 'w', encoding='utf-8') as results_file:
+            json.dump(results, results_file, indent=2)
+        print(f"Per-plan results written to {args.results_out}")
+
+def _load_manifest(manifest_path):
+    """
+    Reads a batch manifest: a JSON list of forms (or an object with a "forms" list).
+    Each form has a "title", an optional "document_title" and "questions", which is
+    either the path of a question bank file (relative to the manifest) or an
+    inline list of {"question", "options", "correct_index", "points"} objects.
+    """
+    with open(manifest_path, 'r', encoding='utf-8') as manifest_file:
+        manifest = json.load(manifest_file)
+    entries = manifest.get('forms') if isinstance(manifest, dict) else manifest
+    if not isinstance(entries, list):
+        raise ValueError("manifest must be a list of forms or an object with a 'forms' list")
+
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    for number, entry in enumerate(entries, start=1):
+        if not isinstance(entry, dict) or not entry.get('title') or 'questions' not in entry:
+            raise ValueError(f"form #{number} needs a 'title' and 'questions'")
+        if isinstance(entry['questions'], str) and entry['questions'] != '-':
+            entry['questions'] = os.path.join(base_dir, entry['questions'])
+    return entries
+
+def _iter_inline_questions(records, label, report_errors=True):
+    """Yields valid questions from an inline manifest list, reporting bad ones by position."""
+    for number, record in enumerate(records, start=1):
+        if isinstance(record, Question): # Entries built in memory, e.g. shards
+            yield record
+            continue
+        try:
+            yield _question_from_record(record)
+        except ValueError as e:
+            if report_errors:
+                print(f"{label}, question {number}: {e}")
+
+def _manifest_questions(entry, report_errors=True):
+    """Returns a lazy iterable of the questions of one manifest entry."""
+    if isinstance(entry['questions'], str):
+        return iter_questions_from_file(entry['questions'], entry.get('format'), report_errors=report_errors)
+    return _iter_inline_questions(entry['questions'], f"Form '{entry['title']}'", report_errors)
+
+shared_http = None # PooledHttp used by every worker thread's service, when enabled
+
+def _thread_service(creds):
+    """
+    Returns this worker thread's own Forms service, building it on first use.
+    The default httplib2 transport is not thread-safe, so services are never shared.
+    With shared_http set they are cheap wrappers over the same connection pool.
+    """
+    service = getattr(_thread_state, 'service', None)
+    if service is None:
+        service = _thread_state.service = _build_service(creds, http=shared_http)
+    return service
+
+def _new_result(entry):
+    result = {"title": entry['title'], "form_id": None, "responder_uri": None,
+              "quiz_setup": False, "questions_added": False, "cached": False, "error": None}
+    for key in ('shard', 'variant'):
+        if key in entry:
+            result[key] = entry[key]
+    return result
+
+def _unexpected_error_result(entry, error):
+    """The status record of a form whose worker raised an error nothing else handled."""
+    result = _new_result(entry)
+    result["error"] = f"unexpected error: {type(error).__name__}: {error}"
+    return result
+
+def _provision_manifest_entry(creds, entry, journal=None, cache=None, cache_key=None, reuse_since=None):
+    """
+    Worker: creates one form from a manifest entry and returns its status record.
+    An identical job already running in this process (same journal key) is
+    waited for; after that, or if reuse_since is given, a form cached for the
+    same inputs since then is returned instead of creating another one.
+    """
+    result = _new_result(entry)
+    started = time.time()
+    try:
+        service = _thread_service(creds)
+        if service is None:
+            result["error"] = "could not build the Forms service"
+            return result
+        document_title = entry.get('document_title') or entry['title']
+        job_key = _job_key(entry['title'], document_title, entry['questions']) if journal else None
+        with journal.claim(job_key) if job_key else contextlib.nullcontext(False) as waited:
+            if waited and reuse_since is None:
+                reuse_since = started
+            cached = cache.lookup(cache_key) if cache and cache_key and reuse_since is not None else None
+            if cached and cached['created_at'] >= reuse_since:
+                result.update(form_id=cached['form_id'], responder_uri=cached['responder_uri'],
+                              quiz_setup=True, questions_added=True, cached=True)
+                return result
+            form_id, responder_uri, quiz_setup_success, questions_added_successfully = _provision_quiz_form(
+                service, entry['title'], document_title, _manifest_questions(entry), journal, job_key)
+    except (OSError, ValueError, RuntimeError) as e:
+        result["error"] = str(e)
+        return result
+    result.update(form_id=form_id, responder_uri=responder_uri,
+                  quiz_setup=quiz_setup_success, questions_added=questions_added_successfully)
+    if form_id is None:
+        result["error"] = "form creation failed"
+    elif cache and quiz_setup_success and questions_added_successfully:
+        cache.store(cache_key, form_id, responder_uri, entry['title'])
+    return result
+
+def _send_http_batches(service, calls):
+    """
+    Sends (api_request, callback) pairs as multipart batch HTTP requests of at
+    most HTTP_BATCH_MAX_CALLS calls and HTTP_BATCH_MAX_BYTES of bodies each.
+    callback(response, error) runs once per call; if a whole batch request
+    fails, its error is passed to the callback of every call in it.
+    """
+    groups, group, group_bytes = [], [], 0
+    for api_request, callback in calls:
+        size = len(api_request.body or '')
+        if group and (len(group) >= HTTP_BATCH_MAX_CALLS or group_bytes + size > HTTP_BATCH_MAX_BYTES):
+            groups.append(group)
+            group, group_bytes = [], 0
+        group.append((api_request, callback))
+        group_bytes += size
+    if group:
+        groups.append(group)
+
+    for group in groups:
+        batch = service.new_batch_http_request()
+        for api_request, callback in group:
+            batch.add(api_request, callback=lambda request_id, response, error, callback=callback: callback(response, error))
+        if write_rate_limiter is not None:
+            for _ in range(len(group) - 1): # Each call in the batch is a write against the quota; _execute takes the last
+                write_rate_limiter.acquire()
+        try:
+            _execute(batch)
+        except (HttpError, ConnectionError, TimeoutError) as e:
+            for _, callback in group:
+                callback(None, e)
+
+class _BatchedFormJob:
+    """
+    One manifest entry provisioned through batch HTTP requests: its create call,
+    then one batchUpdate chunk per round (the quiz settings ride in the first).
+    Transient failures are sent again next round, within the same per-call and
+    per-run retry limits as _execute. If the first chunk fails otherwise, the
+    quiz settings and its questions are sent separately over the next rounds,
+    as _run_batches does. The result record is filled in like
+    _provision_manifest_entry's, and progress is journaled the same way.
+    """
+    def __init__(self, entry, journal=None, cache=None, cache_key=None):
+        self.entry = entry
+        self.result = _new_result(entry)
+        self.document_title = entry.get('document_title') or entry['title']
+        self.journal = journal
+        self.job_key = _job_key(entry['title'], self.document_title, entry['questions']) if journal else None
+        self.cache = cache
+        self.cache_key = cache_key
+        self.chunks = _chunk_requests(itertools.chain(
+            [_quiz_settings_request()], _valid_question_requests(_manifest_questions(entry))))
+        self.chunk = None # (body_text, items, parts) of the chunk being sent
+        self.chunk_has_settings = False # The chunk being sent starts with the quiz settings
+        self.chunks_taken = 0
+        self.split_parts = [] # (parts, has_settings) of a failed first chunk, sent before the next chunk
+        self.items_added = 0
+        self.attempts = 0 # Retries of the current call
+        self.retry_error = None # Set when the last call failed and will be retried
+        self.done = False
+
+    def next_call(self, service):
+        """Returns the (api_request, callback) to send this round, or None once the job is done."""
+        if self.done:
+            return None
+        if self.result["form_id"] is None:
+            return service.forms().create(body=_new_form_body(self.entry['title'], self.document_title)), self._created
+        if self.chunk is None:
+            if self.split_parts:
+                parts, self.chunk_has_settings = self.split_parts.pop(0)
+            else:
+                try:
+                    chunk = next(self.chunks, None)
+                except (OSError, ValueError, RuntimeError) as e:
+                    self._finish(f"cannot read questions: {e}")
+                    return None
+                if chunk is None:
+                    self._finish()
+                    return None
+                parts, self.chunk_has_settings = chunk[0], self.chunks_taken == 0
+                self.chunks_taken += 1
+            self.chunk = _encode_batch_body(parts, self.items_added) + (parts,)
+        return _batch_update_request(service, self.result["form_id"], self.chunk[0]), self._chunk_sent
+
+    def _will_retry(self, error):
+        """Counts a failed call like _execute does; True if it is sent again next round."""
+        self.retry_error = None
+        if not _is_retryable(error):
+            return False
+        if self.attempts >= MAX_RETRIES_PER_CALL or not run_retry_budget.take():
+            with _retry_stats_lock:
+                retry_stats["gave_up"] += 1
+            return False
+        with _retry_stats_lock:
+            retry_stats["retries"] += 1
+        self.attempts += 1
+        self.retry_error = error
+        return True
+
+    def _created(self, response, error):
+        if error is not None:
+            if not self._will_retry(error):
+                self._finish(f"form creation failed: {error}")
+            return
+        self.attempts = 0
+        self.result.update(form_id=response['formId'], responder_uri=response.get('responderUri'))
+        if self.journal:
+            self.journal.record(self.job_key, "form_created", form_id=response['formId'],
+                                responder_uri=response.get('responderUri'))
+
+    def _chunk_sent(self, response, error):
+        form_id = self.result["form_id"]
+        if error is not None:
+            if self._will_retry(error):
+                return
+            parts = self.chunk[2]
+            if self.chunk_has_settings and len(parts) > 1:
+                # batchUpdate is all-or-nothing, so send the parts separately to see which one failed
+                print(f"Error sending the first chunk to form '{form_id}': {error}")
+                print("Retrying the quiz settings and the first chunk of questions separately...")
+                self.split_parts = [(parts[:1], True), (parts[1:], False)]
+            elif self.chunk_has_settings:
+                print(f"Error updating form settings to quiz for form ID {form_id}: {error}")
+                print(f"The form was created (ID: {form_id}, URI: {self.result['responder_uri']}), "
+                      f"but could not be set as a quiz.")
+            else:
+                self._finish(f"adding questions failed after {self.items_added} items: {error}")
+                return
+            self.attempts = 0
+            self.chunk = None
+            return
+        self.attempts = 0
+        if self.chunk_has_settings:
+            self.result["quiz_setup"] = True
+            if self.journal:
+                self.journal.record(self.job_key, "quiz_set", form_id=form_id)
+        self.items_added += self.chunk[1]
+        if self.journal and self.chunk[1]:
+            self.journal.record(self.job_key, "chunk_added", form_id=form_id, items_added=self.items_added)
+        self.chunk = None
+
+    def _finish(self, error=None):
+        self.done = True
+        if error is None and not self.items_added:
+            error = "no valid questions"
+        if error is not None:
+            self.result["error"] = error
+            return
+        self.result["questions_added"] = True
+        if self.journal:
+            self.journal.record(self.job_key, "completed", form_id=self.result["form_id"])
+        if self.cache and self.result["quiz_setup"]:
+            self.cache.store(self.cache_key, self.result["form_id"], self.result["responder_uri"], self.entry['title'])
+
+def _provision_entries_batched(creds, pending, journal=None, cache=None):
+    """
+    Creates forms for (entry, cache_key) pairs with batch HTTP requests: all
+    the creates go up together, then every form's next chunk, round after
+    round. Jobs with an unfinished journal entry are resumed one by one
+    instead. Entries with the same inputs (cache key, else journal key) as an
+    earlier one get its form once it is complete.
+    Yields each form's result record as it completes.
+    """
+    service = _build_service(creds, http=shared_http)
+    if service is None:
+        for entry, _ in pending:
+            result = _new_result(entry)
+            result["error"] = "could not build the Forms service"
+            yield result
+        return
+    started = time.time()
+    jobs = []
+    job_inputs = {} # _BatchedFormJob -> its inputs key
+    first_results = {} # Inputs key -> result of the first entry with those inputs (None while it runs)
+    duplicates = [] # (entry, cache_key, inputs key) of entries with the same inputs as an earlier one
+    for entry, cache_key in pending:
+        try:
+            document_title = entry.get('document_title') or entry['title']
+            job_key = _job_key(entry['title'], document_title, entry['questions']) if journal else None
+            inputs_key = cache_key or job_key
+            if inputs_key and inputs_key in first_results:
+                duplicates.append((entry, cache_key, inputs_key))
+                continue
+            first_results[inputs_key] = None
+            if job_key and journal.pending(job_key):
+                result = first_results[inputs_key] = _provision_manifest_entry(creds, entry, journal, cache, cache_key)
+                yield result
+                continue
+            job = _BatchedFormJob(entry, journal, cache, cache_key)
+            jobs.append(job)
+            job_inputs[job] = inputs_key
+        except (OSError, ValueError, RuntimeError) as e:
+            result = _new_result(entry)
+            result["error"] = str(e)
+            yield result
+
+    round_number = 0
+    while jobs:
+        round_number += 1
+        calls = [call for call in (job.next_call(service) for job in jobs) if call is not None]
+        for job in [job for job in jobs if job.done]:
+            first_results[job_inputs[job]] = job.result
+            yield job.result
+        jobs = [job for job in jobs if not job.done]
+        if not calls:
+            continue
+        print(f"Round {round_number}: sending {len(calls)} calls in batch requests...")
+        _send_http_batches(service, calls)
+        retrying = [job for job in jobs if job.retry_error is not None]
+        if retrying:
+            delay = max(_backoff_seconds(job.attempts - 1, job.retry_error) for job in retrying)
+            with _retry_stats_lock:
+                retry_stats["backoff_seconds"] += delay
+            print(f"{len(retrying)} calls failed transiently. Retrying them in {delay:.1f}s...")
+            time.sleep(delay)
+    for entry, cache_key, inputs_key in duplicates:
+        first = first_results.get(inputs_key)
+        if first and first['form_id'] and first['quiz_setup'] and first['questions_added']:
+            result = _new_result(entry)
+            result.update(form_id=first['form_id'], responder_uri=first['responder_uri'],
+                          quiz_setup=True, questions_added=True, cached=True)
+            yield result
+            continue
+        yield _provision_manifest_entry(creds, entry, journal, cache, cache_key, reuse_since=started)
+
+def _status_word(flag):
+    return "ok" if flag else "FAILED"
+
+def batch_logic(args):
+    """Batch mode: creates every form listed in a manifest using a pool of worker threads."""
+    try:
+        entries = _load_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        print(f"Cannot read manifest: {e}")
+        return
+    if not entries:
+        print("The manifest lists no forms. Exiting script.")
+        return
+    _provision_entries(args, entries)
+
+def _provision_entries(args, entries):
+    """
+    Creates the forms described by manifest-style entries with a pool of worker
+    threads, reusing cached forms (entries with the same inputs as an earlier
+    one reuse its form, as with --http-batch), then prints a summary (and writes
+    --results-out). Returns the per-form result records, or None if
+    authentication failed.
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    global write_rate_limiter, shared_http
+    started_at = time.monotonic()
+    results = []
+    cache = _form_cache(args)
+    pending = [] # (entry, cache_key) pairs that need API calls
+    for entry in entries:
+        cache_key = None
+        if cache and entry['questions'] != '-':
+            try:
+                cache_key = _content_key(entry['title'], entry.get('document_title') or entry['title'],
+                                         _manifest_questions(entry, report_errors=False))
+            except (OSError, ValueError, RuntimeError):
+                cache_key = None # The worker reports the problem
+            cached = cache.lookup(cache_key) if cache_key and not args.refresh_cache else None
+            if cached:
+                result = _new_result(entry)
+                result.update(form_id=cached['form_id'], responder_uri=cached['responder_uri'],
+                              quiz_setup=True, questions_added=True, cached=True)
+                results.append(result)
+                continue
+        pending.append((entry, cache_key))
+    if results:
+        print(f"{len(results)} of {len(entries)} forms were already created from identical inputs (cached).")
+
+    if pending:
+        creds = authenticate(background_refresh=True)
+        if not creds:
+            print("Exiting script due to authentication failure.")
+            return None
+
+        write_rate_limiter = TokenBucket(args.writes_per_minute)
+        if args.transport == 'pooled':
+            shared_http = _pooled_http(creds, args.workers)
+        journal = None if args.no_journal else ProvisioningJournal(args.journal)
+
+        def report(result):
+            results.append(result)
+            print(f"[{len(results)}/{len(entries)}] '{result['title']}': "
+                  f"created {_status_word(result['form_id'])}, quiz setup {_status_word(result['quiz_setup'])}, "
+                  f"questions {_status_word(result['questions_added'])}"
+                  + (f" ({result['error']})" if result['error'] else ""))
+
+        if args.http_batch:
+            print(f"\nCreating {len(pending)} forms with batch HTTP requests of up to {HTTP_BATCH_MAX_CALLS} calls "
+                  f"(at most {args.writes_per_minute} API writes per minute)...")
+            for result in _provision_entries_batched(creds, pending, journal, cache):
+                report(result)
+        else:
+            print(f"\nCreating {len(pending)} forms with {args.workers} workers "
+                  f"(at most {args.writes_per_minute} API writes per minute)...")
+            started = time.time()
+            cache_keys = set()
+            first, duplicates = [], [] # Duplicates have the inputs of an earlier entry and reuse its form
+            for entry, cache_key in pending:
+                (duplicates if cache_key and cache_key in cache_keys else first).append((entry, cache_key))
+                cache_keys.add(cache_key)
+            with ThreadPoolExecutor(max_workers=args.workers) as pool:
+                futures = {pool.submit(_provision_manifest_entry, creds, entry, journal, cache, cache_key): entry
+                           for entry, cache_key in first}
+                for future in as_completed(futures):
+                    try:
+                        report(future.result())
+                    except Exception as e: # An unexpected error fails its form, not the whole run
+                        report(_unexpected_error_result(futures[future], e))
+            for entry, cache_key in duplicates:
+                try:
+                    report(_provision_manifest_entry(creds, entry, journal, cache, cache_key, reuse_since=started))
+                except Exception as e:
+                    report(_unexpected_error_result(entry, e))
+        if shared_http is not None:
+            shared_http.close()
+            shared_http = None
+    if cache:
+        cache.flush()
+
+    elapsed = time.monotonic() - started_at
+    print("\n--- Batch Summary ---")
+    print(f"Forms created: {sum(1 for r in results if r['form_id'])}/{len(results)} in {elapsed:.1f}s")
+    print(f"Quiz setup succeeded: {sum(1 for r in results if r['quiz_setup'])}")
+    print(f"Questions added: {sum(1 for r in results if r['questions_added'])}")
+    print(f"Reused from cache: {sum(1 for r in results if r['cached'])}")
+    print(_retry_summary())
+    if credential_manager is not None:
+        print(credential_manager.summary())
+        credential_manager.stop()
+    for result in results:
+        if not (result['form_id'] and result['quiz_setup'] and result['questions_added']):
+            print(f"  Needs attention: '{result['title']}' (Form ID: {result['form_id']})")
+    if args.results_out:
+        with open(args.results_out, 'w', encoding='utf-8') as results_file:
+            json.dump(results, results_file, indent=2)
+        print(f"Per-form results written to {args.results_out}")
+    return results
+
+def _shard_questions(questions, shard_count):
+    """
+    Splits questions into shard_count lists whose sizes differ by at most one
+    and whose point totals are balanced greedily: highest point values first,
+    each to the shard with the fewest points that still has room.
+    Questions keep their original order within a shard.
+    """
+    base_size, larger_shards = divmod(len(questions), shard_count)
+    sizes = [base_size + (shard < larger_shards) for shard in range(shard_count)]
+    heap = [(0, shard) for shard in range(shard_count) if sizes[shard]] # (points so far, shard)
+    heapq.heapify(heap)
+    assigned = [[] for _ in range(shard_count)]
+    by_points = sorted(range(len(questions)), key=lambda position: -questions[position].points)
+    for position in by_points:
+        points, shard = heapq.heappop(heap)
+        assigned[shard].append(position)
+        if len(assigned[shard]) < sizes[shard]:
+            heapq.heappush(heap, (points + questions[position].points, shard))
+    return [[questions[position] for position in sorted(positions)] for positions in assigned]
+
+def shard_logic(args):
+    """
+    Shard mode: splits a question bank into balanced parts and creates them as
+    separate forms in parallel, or as page-break sections of a single form.
+    Prints the index of shard -> form.
+    """
+    document_title = args.document_title or args.title
+    stats = {}
+    try:
+        questions = list(iter_questions_from_file(args.import_file, args.format, stats))
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"Cannot read question bank: {e}")
+        return
+    if not questions:
+        print(f"No valid questions found in '{args.import_file}' ({stats['invalid']} invalid rows). Exiting script.")
+        return
+
+    shard_count = min(args.shards or -(-len(questions) // args.shard_size), len(questions))
+    shards = _shard_questions(questions, shard_count)
+    print(f"Split {len(questions)} questions into {shard_count} {args.shard_mode}:")
+    for number, shard in enumerate(shards, start=1):
+        print(f"  Part {number}: {len(shard)} questions, {sum(question.points for question in shard)} points")
+
+    if args.shard_mode == 'forms':
+        entries = [{"title": f"{args.title} (Part {number} of {shard_count})",
+                    "document_title": f"{document_title} (Part {number} of {shard_count})",
+                    "questions": shard, "shard": number}
+                   for number, shard in enumerate(shards, start=1)]
+        results = _provision_entries(args, entries)
+        if results is None:
+            return
+        print("\n--- Shard Index ---")
+        for result in sorted(results, key=lambda result: result["shard"]):
+            print(f"Part {result['shard']}: {result['responder_uri'] or result['form_id'] or 'not created'}")
+        return
+
+    items = []
+    first_items = []
+    for number, shard in enumerate(shards, start=1):
+        first_items.append(len(items))
+        if number > 1:
+            items.append(PageBreak(f"Part {number} of {shard_count}"))
+        items.extend(shard)
+
+    creds = authenticate()
+    if not creds:
+        print("Exiting script due to authentication failure.")
+        return
+    service = _build_service(creds)
+    if service is None:
+        return
+    journal = None if args.no_journal else ProvisioningJournal(args.journal)
+    job_key = _job_key(args.title, document_title,
+                       [list(item) if isinstance(item, Question) else item.title for item in items]) if journal else None
+    form_id, responder_uri, quiz_setup_success, questions_added_successfully = _provision_quiz_form(
+        service, args.title, document_title, items, journal, job_key)
+    if form_id is None:
+        print("Form creation failed. Cannot proceed. Exiting.")
+        return
+
+    print("\n--- Shard Index ---")
+    print(f"Form URI: {responder_uri}" if responder_uri else f"Form ID: {form_id}")
+    for number, first_item in enumerate(first_items, start=1):
+        print(f"Part {number}: section starting at item {first_item}")
+    print(f"Quiz setup success: {quiz_setup_success}")
+    print(_retry_summary())
+    print("Questions added successfully." if questions_added_successfully else "Failed to add questions. The form may be partially configured.")
+
+def _variant_allocation(strata, question_count):
+    """
+    How many questions of each point value (stratum) every variant takes, in
+    proportion to the bank (largest remainder rounding). Every variant uses the
+    same allocation, so all of them have the same question count and total points.
+    """
+    bank_size = sum(len(positions) for positions in strata.values())
+    shares = {points: question_count * len(positions) / bank_size for points, positions in strata.items()}
+    allocation = {points: int(share) for points, share in shares.items()}
+    by_remainder = sorted(shares, key=lambda points: (-(shares[points] - allocation[points]), points))
+    for points in by_remainder[:question_count - sum(allocation.values())]:
+        allocation[points] += 1
+    return allocation
+
+def make_variant_specs(questions, variant_count, question_count, seed):
+    """
+    Yields variant_count variants of a validated bank as lists of bank positions:
+    a random subset of question_count questions drawn per point value (see
+    _variant_allocation), in random order. Variant N depends only on the seed
+    and N, so any variant can be regenerated on its own.
+    """
+    strata = collections.defaultdict(list)
+    for position, question in enumerate(questions):
+        strata[question.points].append(position)
+    allocation = _variant_allocation(strata, question_count)
+    for number in range(1, variant_count + 1):
+        rng = random.Random(f"{seed}:{number}")
+        picked = []
+        for points in sorted(strata):
+            picked.extend(rng.sample(strata[points], allocation[points]))
+        rng.shuffle(picked)
+        yield picked
+
+def _load_students(path):
+    """Reads a roster: one student name or ID per line (the first column of a CSV), blank lines skipped."""
+    with open(path, 'r', encoding='utf-8', newline='') as roster_file:
+        return [row[0].strip() for row in csv.reader(roster_file) if row and row[0].strip()]
+
+def variants_logic(args):
+    """
+    Variant mode: builds --variants randomized versions of the --import bank
+    (same question count and total points), creates them in parallel and
+    writes the student -> variant -> form mapping to --variants-out.
+    """
+    document_title = args.document_title or args.title
+    stats = {}
+    try:
+        questions = list(iter_questions_from_file(args.import_file, args.format, stats))
+        students = _load_students(args.students) if args.students else []
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"Cannot read input: {e}")
+        return
+    if not questions:
+        print(f"No valid questions found in '{args.import_file}' ({stats['invalid']} invalid rows). Exiting script.")
+        return
+    variant_count = args.variants or len(students)
+    if not variant_count:
+        print(f"The roster '{args.students}' lists no students. Exiting script.")
+        return
+    question_count = args.variant_questions or len(questions)
+    if question_count > len(questions):
+        print(f"--variant-questions is {question_count}, but the bank has only {len(questions)} valid questions.")
+        return
+
+    specs = list(make_variant_specs(questions, variant_count, question_count, args.seed))
+    total_points = sum(questions[position].points for position in specs[0])
+    print(f"{variant_count} variants of {question_count} questions ({total_points} points each) "
+          f"from a bank of {len(questions)}, seed {args.seed}.")
+    if args.dry_run:
+        for number, spec in enumerate(specs, start=1):
+            print(f"  Variant {number}: questions {', '.join(str(position + 1) for position in spec)}")
+        return
+
+    entries = [{"title": f"{args.title} (Variant {number})",
+                "document_title": f"{document_title} (Variant {number})",
+                "questions": [questions[position] for position in spec], "variant": number}
+               for number, spec in enumerate(specs, start=1)]
+    results = _provision_entries(args, entries)
+    if results is None:
+        return
+    by_variant = {result["variant"]: result for result in results}
+    rows = [(student, number % variant_count + 1) for number, student in enumerate(students)] \
+        or [('', number) for number in range(1, variant_count + 1)]
+    with open(args.variants_out, 'w', newline='', encoding='utf-8') as mapping_file:
+        writer = csv.writer(mapping_file)
+        writer.writerow(['student', 'variant', 'form_id', 'responder_uri'])
+        for student, number in rows:
+            writer.writerow([student, number, by_variant[number]['form_id'] or '', by_variant[number]['responder_uri'] or ''])
+
+    print("\n--- Variant Index ---")
+    for number in range(1, variant_count + 1):
+        assigned = sum(1 for _, variant in rows if variant == number and students)
+        print(f"Variant {number}: {by_variant[number]['responder_uri'] or by_variant[number]['form_id'] or 'not created'}"
+              + (f" ({assigned} students)" if students else ""))
+    print(f"Student mapping written to {args.variants_out}")
+
+class FormJobQueue:
+    """
+    The daemon's jobs: a bounded queue worked off by a fixed pool of threads that
+    share one set of warm credentials, each with its own prebuilt service. Keeps
+    the status of recent jobs and the queue depth and latency metrics.
+    """
+    def __init__(self, creds, workers, journal=None, cache=None, refresh_cache=False):
+        import queue
+        self.creds = creds
+        self.journal = journal
+        self.cache = cache
+        self.refresh_cache = refresh_cache
+        self.queue = queue.Queue(maxsize=DAEMON_MAX_QUEUED_JOBS)
+        self.jobs = collections.OrderedDict() # job_id -> status record, oldest first
+        self.lock = threading.Lock()
+        self.counts = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0, "cached": 0}
+        self.running = 0
+        self.wait_seconds = collections.deque(maxlen=DAEMON_LATENCY_SAMPLES)
+        self.run_seconds = collections.deque(maxlen=DAEMON_LATENCY_SAMPLES)
+        self.started = time.time()
+        self.threads = [threading.Thread(target=self._work, name=f"job-worker-{number}", daemon=True)
+                        for number in range(1, workers + 1)]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, entry, callback_url=None):
+        """Queues a job; returns its status record, or None if the queue is full."""
+        import queue
+        job = {"job_id": os.urandom(8).hex(), "title": entry['title'], "status": "queued",
+               "submitted_at": time.time(), "started_at": None, "finished_at": None,
+               "form_id": None, "responder_uri": None, "quiz_setup": False, "questions_added": False,
+               "cached": False, "error": None}
+        with self.lock:
+            try:
+                self.queue.put_nowait((job['job_id'], entry, callback_url))
+            except queue.Full:
+                self.counts["rejected"] += 1
+                return None
+            self.jobs[job['job_id']] = job
+            self.counts["submitted"] += 1
+            while len(self.jobs) > DAEMON_JOB_HISTORY and next(iter(self.jobs.values()))["status"] in ("done", "failed"):
+                self.jobs.popitem(last=False)
+            return dict(job)
+
+    def status(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _work(self):
+        _thread_service(self.creds) # Built before the first job arrives
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            job_id, entry, callback_url = item
+            with self.lock:
+                job = self.jobs[job_id]
+                job.update(status="running", started_at=time.time())
+                self.running += 1
+            try:
+                result = self._run(entry)
+            except Exception as e: # Anything unexpected fails this job, not the worker
+                result = _unexpected_error_result(entry, e)
+            with self.lock:
+                self.running -= 1
+                succeeded = bool(result['form_id'] and result['quiz_setup'] and result['questions_added'])
+                job.update(result, status="done" if succeeded else "failed", finished_at=time.time())
+                self.counts["completed" if succeeded else "failed"] += 1
+                self.counts["cached"] += result['cached']
+                self.wait_seconds.append(job['started_at'] - job['submitted_at'])
+                self.run_seconds.append(job['finished_at'] - job['started_at'])
+                finished = dict(job)
+            print(f"Job {job_id} '{finished['title']}': {finished['status']} in "
+                  f"{finished['finished_at'] - finished['started_at']:.1f}s"
+                  + (f" ({finished['error']})" if finished['error'] else "")
+                  + (f" -> {finished['responder_uri']}" if finished['responder_uri'] else ""))
+            if callback_url:
+                _post_job_callback(callback_url, finished)
+
+    def _run(self, entry):
+        """Creates the job's form, or returns the cached one for identical inputs."""
+        cache_key = None
+        if self.cache:
+            cache_key = _content_key(entry['title'], entry.get('document_title') or entry['title'], entry['questions'])
+            cached = None if self.refresh_cache else self.cache.lookup(cache_key)
+            if cached:
+                result = _new_result(entry)
+                result.update(form_id=cached['form_id'], responder_uri=cached['responder_uri'],
+                              quiz_setup=True, questions_added=True, cached=True)
+                return result
+        return _provision_manifest_entry(self.creds, entry, self.journal, self.cache, cache_key)
+
+    def metrics(self):
+        """Queue depth, job counts and wait/run/total latency percentiles of recent jobs."""
+        with self.lock:
+            wait_seconds = list(self.wait_seconds)
+            run_seconds = list(self.run_seconds)
+            metrics = {"uptime_s": round(time.time() - self.started, 1), "queue_depth": self.queue.qsize(),
+                       "queue_limit": DAEMON_MAX_QUEUED_JOBS, "running": self.running, "workers": len(self.threads)}
+            metrics.update(self.counts)
+        metrics["latency"] = {"wait": _latency_percentiles(wait_seconds),
+                              "run": _latency_percentiles(run_seconds),
+                              "total": _latency_percentiles([wait + run for wait, run in zip(wait_seconds, run_seconds)])}
+        metrics["retry_stats"] = dict(retry_stats)
+        if credential_manager is not None:
+            metrics["credential_stats"] = dict(credential_manager.stats)
+        if run_metrics is not None:
+            metrics["api"] = run_metrics.summary_rows()
+        return metrics
+
+    def stop(self, timeout=None):
+        """Lets the workers finish the running jobs; queued jobs that have not started are dropped."""
+        import queue
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                break
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join(timeout)
+
+def _latency_percentiles(samples):
+    if not samples:
+        return {"count": 0, "p50_s": None, "p90_s": None, "p99_s": None}
+    ordered = sorted(samples)
+    def percentile(fraction):
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))], 3)
+    return {"count": len(ordered), "p50_s": percentile(0.50), "p90_s": percentile(0.90), "p99_s": percentile(0.99)}
+
+def _post_job_callback(callback_url, job):
+    """POSTs a finished job's status record to the URL given when it was submitted."""
+    import urllib.request
+    request = urllib.request.Request(callback_url, data=json.dumps(job).encode('utf-8'), method='POST',
+                                     headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=DAEMON_CALLBACK_TIMEOUT_SECONDS):
+            pass
+    except (OSError, ValueError) as e:
+        print(f"Job {job['job_id']}: callback to {callback_url} failed: {e}")
+
+def _job_entry_from_request(body):
+    """
+    Turns a submitted job ({"title", "document_title", "questions", "callback_url"})
+    into a manifest-style entry with validated Questions, and its callback URL.
+    Raises ValueError listing what is wrong; a job is accepted whole or not at all.
+    """
+    if not isinstance(body, dict) or not isinstance(body.get('title'), str) or not body['title'].strip():
+        raise ValueError("a job needs a 'title'")
+    records = body.get('questions')
+    if not isinstance(records, list) or not records:
+        raise ValueError("'questions' must be a non-empty list of {question, options, correct_index, points} objects")
+    questions = []
+    errors = []
+    for number, record in enumerate(records, start=1):
+        try:
+            questions.append(_question_from_record(record))
+        except ValueError as e:
+            errors.append(f"question {number}: {e}")
+    if errors:
+        raise ValueError("; ".join(errors[:20]) + (f" (and {len(errors) - 20} more)" if len(errors) > 20 else ""))
+    callback_url = body.get('callback_url')
+    if callback_url is not None and not (isinstance(callback_url, str) and callback_url.startswith(('http://', 'https://'))):
+        raise ValueError("'callback_url' must be an http(s) URL")
+    entry = {"title": body['title'], "document_title": body.get('document_title') or body['title'],
+             "questions": questions}
+    return entry, callback_url
+
+def _remove_socket_file(path):
+    """Removes the Unix socket at path, if any. Raises ValueError if path is some other kind of file."""
+    import stat
+    try:
+        mode = os.lstat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise ValueError(f"'{path}' exists and is not a socket; choose another --socket path")
+    os.remove(path)
+
+def _daemon_server(job_queue, address=None, socket_path=None):
+    """
+    Builds the daemon's HTTP server on a TCP address ("host:port") or a Unix socket:
+      POST /jobs       submit a job; answers 202 with its job_id
+      GET  /jobs/<id>  status, form_id and responder_uri of a job
+      GET  /metrics    queue depth, job counts and latencies
+    """
+    import http.server
+    import socketserver
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _reply(self, status, payload):
+            data = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            if self.path.rstrip('/') != '/jobs':
+                self._reply(404, {"error": "not found"})
+                return
+            length = int(self.headers.get('Content-Length') or 0)
+            if length > DAEMON_MAX_JOB_BYTES:
+                self.close_connection = True
+                self._reply(413, {"error": f"jobs are limited to {DAEMON_MAX_JOB_BYTES} bytes"})
+                return
+            try:
+                entry, callback_url = _job_entry_from_request(json.loads(self.rfile.read(length) or b'null'))
+            except ValueError as e: # Also covers malformed JSON
+                self._reply(400, {"error": str(e)})
+                return
+            job = job_queue.submit(entry, callback_url)
+            if job is None:
+                self._reply(503, {"error": "job queue is full, retry later"})
+                return
+            job["queue_depth"] = job_queue.queue.qsize()
+            self._reply(202, job)
+
+        def do_GET(self):
+            path = self.path.rstrip('/')
+            if path == '/metrics':
+                self._reply(200, job_queue.metrics())
+            elif path.startswith('/jobs/'):
+                job = job_queue.status(path[len('/jobs/'):])
+                self._reply(200, job) if job else self._reply(404, {"error": "unknown job"})
+            else:
+                self._reply(404, {"error": "not found"})
+
+        def log_message(self, format, *args):
+            pass # Each job is reported when it finishes instead
+
+    if socket_path:
+        class UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+            daemon_threads = True
+
+            def get_request(self):
+                request, _ = super().get_request()
+                return request, ('local', 0) # Unix sockets have no client address
+
+        _remove_socket_file(socket_path) # Left behind by a daemon that did not shut down cleanly
+        return UnixServer(socket_path, Handler)
+    host, _, port = address.rpartition(':')
+    return http.server.ThreadingHTTPServer((host or '127.0.0.1', int(port)), Handler)
+
+def serve_logic(args):
+    """
+    Daemon mode: authenticates and builds the workers' services once, then creates
+    forms for jobs posted over HTTP (or a Unix socket) until interrupted.
+    """
+    global write_rate_limiter, shared_http, run_retry_budget
+    creds = authenticate(background_refresh=True)
+    if not creds:
+        print("Exiting script due to authentication failure.")
+        return
+    write_rate_limiter = TokenBucket(args.writes_per_minute)
+    run_retry_budget = RetryBudget(RETRY_BUDGET_PER_RUN, window_seconds=DAEMON_RETRY_WINDOW_SECONDS)
+    if args.transport == 'pooled':
+        shared_http = _pooled_http(creds, args.workers)
+    journal = None if args.no_journal else ProvisioningJournal(args.journal)
+    job_queue = FormJobQueue(creds, args.workers, journal, _form_cache(args), args.refresh_cache)
+    try:
+        server = _daemon_server(job_queue, args.serve, args.socket)
+    except (OSError, ValueError) as e:
+        print(f"Cannot start the server: {e}")
+        job_queue.stop()
+        return
+    where = f"unix socket {args.socket}" if args.socket else f"http://{args.serve}"
+    print(f"Serving on {where} with {args.workers} workers "
+          f"(at most {args.writes_per_minute} API writes per minute). Press Ctrl+C to stop.")
+    print("POST /jobs to submit a form, GET /jobs/<id> for its status, GET /metrics for the queue.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping: waiting for running jobs to finish...")
+    finally:
+        server.server_close()
+        job_queue.stop()
+        if job_queue.cache:
+            job_queue.cache.flush()
+        if args.socket:
+            _remove_socket_file(args.socket)
+        if shared_http is not None:
+            shared_http.close()
+            shared_http = None
+        metrics = job_queue.metrics()
+        print(f"Jobs completed: {metrics['completed']}, failed: {metrics['failed']}, rejected: {metrics['rejected']}")
+        print(_retry_summary())
+        if credential_manager is not None:
+            print(credential_manager.summary())
+            credential_manager.stop()
+
+def _chain_first(first_item, rest):
+    """Yields first_item followed by the remaining items of an iterator."""
+    yield first_item
+    yield from rest
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Create a Google Forms quiz interactively or from a question bank file.")
+    parser.add_argument('--import', dest='import_file', metavar='FILE',
+                        help="question bank to import (CSV, JSONL or YAML; '-' reads stdin)")
+    parser.add_argument('--format', choices=IMPORT_FORMATS,
+                        help="format of the import file (default: guessed from the extension)")
+    parser.add_argument('--title', help="form title (required with --import)")
+    parser.add_argument('--document-title', help="document title (default: same as --title)")
+    parser.add_argument('--sync', metavar='FORM_ID',
+                        help="update an existing form to match the --import bank, sending only the changes")
+    parser.add_argument('--compile', metavar='PLAN',
+                        help="validate the --import bank and write its batchUpdate bodies to PLAN, without API calls")
+    parser.add_argument('--replay', metavar='PLAN', nargs='+',
+                        help="create forms from plans written by --compile, several at once with --workers")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="with --import or --replay, only report the API calls and request bytes it would take; "
+                             "with --variants, only list the questions of each variant")
+    parser.add_argument('--manifest', metavar='FILE',
+                        help="JSON manifest of many forms to create concurrently")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f"concurrent forms in --manifest and daemon mode (default: {DEFAULT_WORKERS})")
+    parser.add_argument('--http-batch', action='store_true',
+                        help="in --manifest/--shards mode, send the calls of many forms together in batch HTTP "
+                             "requests instead of using worker threads")
+    parser.add_argument('--transport', choices=HTTP_TRANSPORTS, default='httplib2',
+                        help="HTTP transport of the workers: an httplib2 connection per worker, or one "
+                             "keep-alive connection pool shared by all of them (needs 'requests'; default: httplib2)")
+    parser.add_argument('--fixed-batch-size', action='store_true',
+                        help=f"always send up to {MAX_ITEMS_PER_BATCH} questions per batchUpdate instead of adapting "
+                             "the size to the observed latency and errors")
+    parser.add_argument('--writes-per-minute', type=int, default=DEFAULT_WRITES_PER_MINUTE,
+                        help=f"API write quota shared by all workers (default: {DEFAULT_WRITES_PER_MINUTE})")
+    parser.add_argument('--serve', nargs='?', const=DAEMON_DEFAULT_ADDRESS, metavar='HOST:PORT',
+                        help=f"run as a daemon that keeps credentials warm and creates forms for jobs posted "
+                             f"over HTTP (default address: {DAEMON_DEFAULT_ADDRESS})")
+    parser.add_argument('--socket', metavar='PATH',
+                        help="run the daemon on a Unix socket at PATH instead of a TCP port")
+    parser.add_argument('--results-out', metavar='FILE',
+                        help="write per-form results of --manifest or --shards mode as JSON")
+    parser.add_argument('--shards', type=int, metavar='N',
+                        help="split the --import bank into N parts balanced by points and question count")
+    parser.add_argument('--shard-size', type=int, metavar='QUESTIONS',
+                        help="split the --import bank into parts of at most this many questions")
+    parser.add_argument('--shard-mode', choices=SHARD_MODES, default='forms',
+                        help="create the parts as separate forms in parallel or as sections of one form (default: forms)")
+    parser.add_argument('--variants', type=int, metavar='N',
+                        help="create N randomized variants of the --import bank with the same question count "
+                             "and total points (default with --students: one per student)")
+    parser.add_argument('--variant-questions', type=int, metavar='K',
+                        help="questions per variant, drawn in proportion to each point value (default: all, reordered)")
+    parser.add_argument('--seed', default='0',
+                        help="seed of the variants; the same bank and seed always give the same variants (default: 0)")
+    parser.add_argument('--students', metavar='FILE',
+                        help="roster with one student per line; students are assigned to variants in turn")
+    parser.add_argument('--variants-out', metavar='FILE', default=VARIANTS_FILE,
+                        help=f"where to write the student -> variant -> form CSV (default: {VARIANTS_FILE})")
+    parser.add_argument('--journal', metavar='FILE', default=JOURNAL_FILE,
+                        help=f"resume journal for --import/--manifest runs (default: {JOURNAL_FILE})")
+    parser.add_argument('--no-journal', action='store_true',
+                        help="do not journal progress or resume unfinished forms")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="always create a new form, even for inputs identical to an earlier run")
+    parser.add_argument('--refresh-cache', action='store_true',
+                        help="ignore cached forms for this run and cache the newly created ones instead")
+    parser.add_argument('--clear-cache', action='store_true',
+                        help="forget every cached form before running")
+    parser.add_argument('--cache-file', metavar='FILE', default=FORM_CACHE_FILE,
+                        help=f"form cache location (default: {FORM_CACHE_FILE})")
+    parser.add_argument('--cache-ttl-days', type=float, default=FORM_CACHE_TTL_DAYS,
+                        help=f"how long a cached form is reused (default: {FORM_CACHE_TTL_DAYS})")
+    parser.add_argument('--offline', action='store_true',
+                        help="build the API client from the cached or bundled discovery document without fetching it")
+    parser.add_argument('--metrics', metavar='FILE',
+                        help="append a JSON line per API call and pipeline stage (time, bytes, retries, outcome)")
+    parser.add_argument('--metrics-summary', action='store_true',
+                        help="print a table of time and bytes per stage and API method at the end")
+    parser.add_argument('--profile', choices=PROFILE_MODES,
+                        help="profile the run with cProfile (cpu) or tracemalloc (memory)")
+    args = parser.parse_args(argv)
+    if args.sync and not args.import_file:
+        parser.error("--sync needs the question bank given with --import")
+    if args.import_file and not args.title and not args.sync:
+        parser.error("--title is required with --import")
+    if args.import_file and args.manifest:
+        parser.error("--import and --manifest cannot be used together")
+    if args.shards is not None or args.shard_size is not None:
+        if not args.import_file or args.sync:
+            parser.error("--shards and --shard-size split an --import bank and cannot be used with --sync")
+        if args.shards is not None and args.shard_size is not None:
+            parser.error("use either --shards or --shard-size")
+        if (args.shards is not None and args.shards < 1) or (args.shard_size is not None and args.shard_size < 1):
+            parser.error("--shards and --shard-size must be at least 1")
+    if args.variants is not None or args.variant_questions is not None or args.students:
+        if not args.import_file or args.sync or args.shards or args.shard_size or args.compile:
+            parser.error("--variants and --students need an --import bank and cannot be combined with "
+                         "--sync, --shards or --compile")
+        if (args.variants is not None and args.variants < 1) or \
+                (args.variant_questions is not None and args.variant_questions < 1):
+            parser.error("--variants and --variant-questions must be at least 1")
+        if args.variants is None and not args.students:
+            parser.error("--variant-questions needs --variants or --students")
+    elif args.compile or args.dry_run:
+        if args.replay:
+            if args.compile:
+                parser.error("--compile and --replay cannot be used together")
+        elif not args.import_file or not args.title or args.sync or args.shards or args.shard_size:
+            parser.error("--compile and --dry-run need an --import bank and --title (or --replay with --dry-run)")
+    if args.replay and (args.import_file or args.manifest or args.sync):
+        parser.error("--replay takes its questions from the plans, not from --import, --manifest or --sync")
+    if args.serve or args.socket:
+        if args.import_file or args.manifest or args.sync or args.replay:
+            parser.error("--serve and --socket take their jobs over the network, not from --import, --manifest or --sync")
+        if args.serve and args.socket:
+            parser.error("use either --serve or --socket")
+        if args.serve and not args.serve.rpartition(':')[2].isdigit():
+            parser.error("--serve expects HOST:PORT, e.g. 127.0.0.1:8780")
+        import socket
+        if args.socket and not hasattr(socket, 'AF_UNIX'):
+            parser.error("Unix sockets are not available on this platform; use --serve")
+    if args.workers < 1 or args.writes_per_minute < 1:
+        parser.error("--workers and --writes-per-minute must be at least 1")
+    return args
+
+
+def _run_mode(args):
+    """Runs the mode selected on the command line."""
+    if args.serve or args.socket:
+        serve_logic(args)
+    elif args.replay:
+        replay_logic(args)
+    elif args.sync:
+        sync_logic(args)
+    elif args.manifest:
+        batch_logic(args)
+    elif args.shards or args.shard_size:
+        shard_logic(args)
+    elif args.variants or args.variant_questions or args.students:
+        variants_logic(args)
+    elif args.compile or args.dry_run:
+        compile_logic(args)
+    elif args.import_file:
+        import_logic(args)
+    elif not args.clear_cache:
+        main_logic()
+
 
 if __name__ == '__main__':
-    main_logic()
+    cli_args = _parse_args()
+    offline_mode = cli_args.offline
+    if cli_args.metrics or cli_args.metrics_summary:
+        run_metrics = RunMetrics(cli_args.metrics)
+    if not cli_args.fixed_batch_size:
+        batch_sizer = AdaptiveBatchSize()
+    if cli_args.clear_cache:
+        FormCache(cli_args.cache_file).clear()
+        print(f"Form cache {cli_args.cache_file} cleared.")
+    try:
+        _run_profiled(cli_args.profile, lambda: _run_mode(cli_args))
+    finally:
+        if run_metrics is not None:
+            run_metrics.finish(print_summary=cli_args.metrics_summary)
@@ -1,10 +1,9 @@
 import os
 import pickle
 import json # For potential debugging
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+# Only the light errors module is imported up front. google-auth, oauthlib and the
+# discovery client are imported inside the functions that need them, which keeps
+# startup on the phone fast.
 from googleapiclient.errors import HttpError
 
 # Global Constants
@@ -28,6 +27,7 @@ def authenticate():
         if creds and creds.expired and creds.refresh_token:
             try:
                 print("Refreshing expired credentials...")
+                from google.auth.transport.requests import Request
                 creds.refresh(Request())
             except Exception as e:
                 print(f"Error refreshing credentials: {e}")
@@ -40,6 +40,7 @@ def authenticate():
                 return None
             try:
                 print(f"No valid token found or token expired. Running authentication flow using {CREDENTIALS_JSON_FILE}...")
+                from google_auth_oauthlib.flow import InstalledAppFlow
                 flow = InstalledAppFlow.from_client_secrets_file(
                     CREDENTIALS_JSON_FILE, SCOPES)
                 creds = flow.run_local_server(port=8080)
@@ -65,6 +66,36 @@ def authenticate():
         print("Using valid existing credentials.")
     return creds
 
+def _build_service(creds):
+    """
+    Builds the Forms API service, preferring the cached discovery document so
+    no network round trip is needed. Falls back to fetching (and caching) it,
+    then to a stale copy or the document bundled with the client library.
+    Without Form_creator_code.py alongside, builds without the cache.
+    Returns None (after printing why) if every option fails.
+    """
+    try:
+        from googleapiclient.discovery import build, build_from_document
+        try:
+            from Form_creator_code import DiscoveryFileCache # Shared with the main script, same cache file
+        except ImportError: # This script also runs on its own
+            return build('forms', 'v1', credentials=creds)
+        cache = DiscoveryFileCache()
+        document = cache.load()
+        if document is not None:
+            return build_from_document(document, credentials=creds)
+        try:
+            return build('forms', 'v1', credentials=creds, cache=cache, static_discovery=False)
+        except Exception as e: # Network or discovery errors: fall back to an offline build
+            print(f"Could not fetch the discovery document ({e}). Building offline...")
+        document = cache.load(allow_stale=True)
+        if document is not None:
+            return build_from_document(document, credentials=creds)
+        return build('forms', 'v1', credentials=creds, static_discovery=True)
+    except Exception as e: # Catch errors during service build
+        print(f"Failed to build Google Forms API service: {e}")
+        return None
+
 def _create_form_and_set_quiz(service, form_title, document_title):
     """
     Creates a basic form and then configures it as a quiz.
@@ -203,11 +234,8 @@ def main_logic():
         return
 
     print("\nBuilding Google Forms service...")
-    service = None
-    try:
-        service = build('forms', 'v1', credentials=creds)
-    except Exception as e: # Catch errors during service build
-        print(f"Failed to build Google Forms API service: {e}")
+    service = _build_service(creds)
+    if service is None:
         return
 
     form_id, responder_uri, quiz_setup_success = _create_form_and_set_quiz(service, form_title, document_title)
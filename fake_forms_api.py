@@ -0,0 +1,536 @@
+import re
+import uuid
+import sys
+import json
+import time
+import random
+import functools
+import argparse
+import itertools
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+# Offline stand-in for the Google Forms v1 endpoints the quiz creator uses
+# (forms.create, forms.batchUpdate, forms.get, forms.responses.list, and batch
+# HTTP requests of them).
+# It can be used in-process as a
+# drop-in for the service object returned by build(), or served over HTTP so
+# the real client library can be pointed at it with
+#   build('forms', 'v1', credentials=AnonymousCredentials(),
+#         client_options={'api_endpoint': 'http://127.0.0.1:8765/'})
+# Latency, transient errors (429/5xx) and request-size limits are configurable,
+# which makes it the backend for forms_benchmark.py.
+
+DEFAULT_PORT = 8765
+MAX_RESPONSES_PAGE_SIZE = 5000 # Same cap as the real responses.list
+
+class FakeApiError(Exception):
+    """An error response the fake API returns instead of a result."""
+    def __init__(self, status, message, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.retry_after = retry_after
+
+    def body(self):
+        return json.dumps({"error": {"code": self.status, "message": self.message}}).encode('utf-8')
+
+class FakeFormsBackend:
+    """
+    Thread-safe in-memory forms store with the Forms v1 semantics the scripts
+    rely on: batchUpdate is applied in order and is all-or-nothing.
+    latency_ms/jitter_ms delay every call, error_rate injects transient
+    errors with a status from error_statuses, and max_body_bytes /
+    max_requests_per_batch reject oversized batchUpdate calls with a 400.
+    latency_per_request_ms adds time per request in a batchUpdate, so large
+    chunks are slower than small ones as with the real API.
+    """
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, error_statuses=(429, 503),
+                 max_body_bytes=None, max_requests_per_batch=None, seed=None, latency_per_request_ms=0.0):
+        self.latency_ms = latency_ms
+        self.latency_per_request_ms = latency_per_request_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.max_body_bytes = max_body_bytes
+        self.max_requests_per_batch = max_requests_per_batch
+        self.random = random.Random(seed)
+        self.forms = {}
+        self.simulated_responses = {} # form_id -> (count, seed); responses are generated page by page
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+        self.stats = {"calls": 0, "errors_injected": 0, "rejected": 0, "latencies": [], "by_method": {},
+                      "batches": 0, "batched_calls": 0}
+        self.local = threading.local() # in_batch: the round trip latency was already paid by the batch
+
+    def _round_trip_delay(self):
+        return max(0.0, self.latency_ms + self.random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+
+    def _begin(self, method):
+        """Records the call, waits out the simulated latency and maybe injects an error."""
+        with self.lock:
+            self.stats["calls"] += 1
+            self.stats["by_method"][method] = self.stats["by_method"].get(method, 0) + 1
+            delay = 0.0 if getattr(self.local, 'in_batch', False) else self._round_trip_delay()
+            inject = self.random.random() < self.error_rate
+            status = self.random.choice(self.error_statuses) if inject else None
+            if inject:
+                self.stats["errors_injected"] += 1
+        if delay:
+            time.sleep(delay)
+        if inject:
+            raise FakeApiError(status, "Injected transient error", retry_after=0 if status == 429 else None)
+
+    def run_batch(self, calls):
+        """
+        Runs calls (functions of no arguments) as one batch HTTP request: the
+        simulated latency is paid once for the round trip, while every call still
+        counts, can fail on its own and is answered in order.
+        Returns a list of (response, FakeApiError or None).
+        """
+        with self.lock:
+            self.stats["batches"] += 1
+            self.stats["batched_calls"] += len(calls)
+            delay = self._round_trip_delay()
+        if delay:
+            time.sleep(delay)
+        self.local.in_batch = True
+        outcomes = []
+        try:
+            for call in calls:
+                try:
+                    outcomes.append((call(), None))
+                except FakeApiError as e:
+                    outcomes.append((None, e))
+        finally:
+            self.local.in_batch = False
+        return outcomes
+
+    def round_trips(self):
+        """HTTP round trips so far: unbatched calls plus batch requests."""
+        with self.lock:
+            return self.stats["calls"] - self.stats["batched_calls"] + self.stats["batches"]
+
+    def _record_latency(self, started):
+        with self.lock:
+            self.stats["latencies"].append(time.perf_counter() - started)
+
+    def _new_id(self, prefix):
+        return f"{prefix}{next(self.ids):08x}"
+
+    def create(self, body):
+        started = time.perf_counter()
+        try:
+            self._begin('create')
+            info = dict((body or {}).get('info', {}))
+            if 'title' not in info:
+                raise FakeApiError(400, "info.title is required")
+            with self.lock:
+                form_id = self._new_id('fakeform')
+                form = {"formId": form_id, "info": info, "settings": {}, "items": [],
+                        "revisionId": "1", "responderUri": f"https://fake.forms.local/{form_id}/viewform"}
+                self.forms[form_id] = form
+                return json.loads(json.dumps(form))
+        finally:
+            self._record_latency(started)
+
+    def simulate_responses(self, form_id, count, seed=0):
+        """
+        Gives a form count synthetic quiz responses. They are generated when
+        listed, so large counts cost no memory; respondents of higher ability
+        pick the correct option more often, which gives the items realistic
+        difficulty and discrimination.
+        """
+        with self.lock:
+            if form_id not in self.forms:
+                raise FakeApiError(404, f"Requested entity was not found: {form_id}")
+            self.simulated_responses[form_id] = (count, seed)
+
+    def _simulated_response(self, number, seed, graded_items):
+        generator = random.Random(seed * 1000003 + number)
+        ability = generator.random()
+        answers = {}
+        total = 0
+        for position, (question_id, options, correct_value, points) in enumerate(graded_items):
+            if generator.random() < 0.02:
+                continue # Left unanswered
+            difficulty = (position * 0.37) % 1.0
+            if generator.random() < 0.25 + 0.7 * ability * (1.0 - 0.5 * difficulty):
+                value = correct_value
+            else:
+                value = generator.choice(options)
+            correct = value == correct_value
+            total += points if correct else 0
+            answers[question_id] = {"questionId": question_id, "textAnswers": {"answers": [{"value": value}]},
+                                    "grade": {"score": points if correct else 0, "correct": correct}}
+        submitted = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(1700000000 + number * 60))
+        return {"responseId": f"resp{number:08d}", "createTime": submitted, "lastSubmittedTime": submitted,
+                "totalScore": total, "answers": answers}
+
+    def list_responses(self, form_id, page_size=None, page_token=None):
+        started = time.perf_counter()
+        try:
+            self._begin('responses.list')
+            with self.lock:
+                form = self.forms.get(form_id)
+                if form is None:
+                    raise FakeApiError(404, f"Requested entity was not found: {form_id}")
+                count, seed = self.simulated_responses.get(form_id, (0, 0))
+                graded_items = []
+                for item in form["items"]:
+                    question = item.get('questionItem', {}).get('question', {})
+                    if 'choiceQuestion' in question and 'grading' in question:
+                        graded_items.append((question["questionId"],
+                                             [option['value'] for option in question['choiceQuestion']['options']],
+                                             question['grading']['correctAnswers']['answers'][0]['value'],
+                                             question['grading'].get('pointValue', 0)))
+            page_size = min(int(page_size or MAX_RESPONSES_PAGE_SIZE), MAX_RESPONSES_PAGE_SIZE)
+            start = int(page_token or 0)
+            end = min(start + page_size, count)
+            page = {"responses": [self._simulated_response(number, seed, graded_items)
+                                  for number in range(start, end)]}
+            if end < count:
+                page["nextPageToken"] = str(end)
+            return page
+        finally:
+            self._record_latency(started)
+
+    def get(self, form_id):
+        started = time.perf_counter()
+        try:
+            self._begin('get')
+            with self.lock:
+                form = self.forms.get(form_id)
+                if form is None:
+                    raise FakeApiError(404, f"Requested entity was not found: {form_id}")
+                return json.loads(json.dumps(form))
+        finally:
+            self._record_latency(started)
+
+    def batch_update(self, form_id, body):
+        """body is the decoded dict or the raw JSON text as sent by the client."""
+        started = time.perf_counter()
+        try:
+            self._begin('batchUpdate')
+            body_text = body if isinstance(body, str) else json.dumps(body)
+            if self.max_body_bytes and len(body_text.encode('utf-8')) > self.max_body_bytes:
+                with self.lock:
+                    self.stats["rejected"] += 1
+                raise FakeApiError(400, "Request payload size exceeds the limit")
+            requests = json.loads(body_text).get('requests', [])
+            if self.max_requests_per_batch and len(requests) > self.max_requests_per_batch:
+                with self.lock:
+                    self.stats["rejected"] += 1
+                raise FakeApiError(400, "Too many requests in batch")
+            if self.latency_per_request_ms:
+                time.sleep(len(requests) * self.latency_per_request_ms / 1000)
+            with self.lock:
+                form = self.forms.get(form_id)
+                if form is None:
+                    raise FakeApiError(404, f"Requested entity was not found: {form_id}")
+                # All-or-nothing: apply to a copy first (items from requests are fresh dicts)
+                working = dict(form, items=list(form["items"]), settings=dict(form["settings"]))
+                replies = [self._apply(working, request) for request in requests]
+                working["revisionId"] = str(int(form["revisionId"]) + 1)
+                self.forms[form_id] = working
+                return {"replies": replies, "writeControl": {"requiredRevisionId": working["revisionId"]}}
+        finally:
+            self._record_latency(started)
+
+    def _location(self, items, location, allow_end=False):
+        index = (location or {}).get('index')
+        limit = len(items) if allow_end else len(items) - 1
+        if not isinstance(index, int) or not 0 <= index <= limit:
+            raise FakeApiError(400, f"Invalid location index {index} for {len(items)} items")
+        return index
+
+    def _apply(self, form, request):
+        items = form["items"]
+        if 'updateSettings' in request:
+            form["settings"].update(request['updateSettings'].get('settings', {}))
+            return {}
+        if 'createItem' in request:
+            item = dict(request['createItem']['item'])
+            index = self._location(items, request['createItem'].get('location'), allow_end=True)
+            item["itemId"] = self._new_id('item')
+            question = item.get('questionItem', {}).get('question')
+            question_ids = []
+            if question is not None:
+                question["questionId"] = self._new_id('q')
+                question_ids.append(question["questionId"])
+            items.insert(index, item)
+            return {"createItem": {"itemId": item["itemId"], "questionId": question_ids}}
+        if 'deleteItem' in request:
+            items.pop(self._location(items, request['deleteItem'].get('location')))
+            return {}
+        if 'moveItem' in request:
+            item = items.pop(self._location(items, request['moveItem'].get('originalLocation')))
+            items.insert(self._location(items, request['moveItem'].get('newLocation'), allow_end=True), item)
+            return {}
+        if 'updateItem' in request:
+            index = self._location(items, request['updateItem'].get('location'))
+            item = dict(request['updateItem']['item'])
+            item["itemId"] = items[index]["itemId"]
+            items[index] = item
+            return {}
+        raise FakeApiError(400, f"Unsupported request: {sorted(request)}")
+
+    def latency_percentiles(self):
+        """Returns {'p50_ms': ..., 'p99_ms': ...} over every call so far."""
+        with self.lock:
+            latencies = sorted(self.stats["latencies"])
+        if not latencies:
+            return {"p50_ms": None, "p99_ms": None}
+        def percentile(fraction):
+            return round(latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] * 1000, 2)
+        return {"p50_ms": percentile(0.50), "p99_ms": percentile(0.99)}
+
+# --- In-process adapter -------------------------------------------------------
+
+def _http_error(error, uri):
+    """Turns a FakeApiError into the googleapiclient HttpError the scripts catch."""
+    import httplib2
+    from googleapiclient.errors import HttpError
+    headers = {"status": str(error.status), "content-type": "application/json"}
+    if error.retry_after is not None:
+        headers["retry-after"] = str(error.retry_after)
+    return HttpError(httplib2.Response(headers), error.body(), uri=uri)
+
+class FakeRequest:
+    """Mimics googleapiclient's HttpRequest: a prepared call with a body and execute()."""
+    def __init__(self, backend, method_id, method, uri, call, body=None):
+        self.backend = backend
+        self.methodId = method_id
+        self.method = method
+        self.uri = uri
+        self.call = call
+        self.body = json.dumps(body) if body is not None else None
+        self.body_size = len(self.body or "")
+        self.headers = {}
+
+    def execute(self, http=None, num_retries=0):
+        try:
+            return self.call(self.body)
+        except FakeApiError as e:
+            raise _http_error(e, self.uri)
+
+class _FakeFormsResource:
+    def __init__(self, backend):
+        self.backend = backend
+
+    def create(self, body=None):
+        return FakeRequest(self.backend, 'forms.forms.create', 'POST', '/v1/forms',
+                           lambda body_text: self.backend.create(json.loads(body_text)), body)
+
+    def batchUpdate(self, formId=None, body=None):
+        return FakeRequest(self.backend, 'forms.forms.batchUpdate', 'POST', f'/v1/forms/{formId}:batchUpdate',
+                           lambda body_text: self.backend.batch_update(formId, body_text), body)
+
+    def get(self, formId=None):
+        return FakeRequest(self.backend, 'forms.forms.get', 'GET', f'/v1/forms/{formId}',
+                           lambda body_text: self.backend.get(formId))
+
+    def responses(self):
+        return _FakeResponsesResource(self.backend)
+
+class _FakeResponsesResource:
+    def __init__(self, backend):
+        self.backend = backend
+
+    def list(self, formId=None, pageSize=None, pageToken=None, filter=None):
+        return FakeRequest(self.backend, 'forms.forms.responses.list', 'GET', f'/v1/forms/{formId}/responses',
+                           lambda body_text: self.backend.list_responses(formId, pageSize, pageToken))
+
+class FakeBatchRequest:
+    """Mimics googleapiclient's BatchHttpRequest: add() requests, then execute() sends them in one round trip."""
+    def __init__(self, backend, callback=None):
+        self.backend = backend
+        self.callback = callback
+        self.requests = [] # (request_id, FakeRequest, callback)
+
+    def add(self, request, callback=None, request_id=None):
+        self.requests.append((request_id or str(len(self.requests) + 1), request, callback))
+
+    def execute(self, http=None):
+        outcomes = self.backend.run_batch([functools.partial(request.call, request.body)
+                                           for _, request, _ in self.requests])
+        for (request_id, request, callback), (response, error) in zip(self.requests, outcomes):
+            callback = callback or self.callback
+            if callback:
+                callback(request_id, response, _http_error(error, request.uri) if error else None)
+
+class FakeFormsService:
+    """Stands in for build('forms', 'v1', ...) without any network or credentials."""
+    def __init__(self, backend=None):
+        self.backend = backend or FakeFormsBackend()
+
+    def forms(self):
+        return _FakeFormsResource(self.backend)
+
+    def new_batch_http_request(self, callback=None):
+        return FakeBatchRequest(self.backend, callback)
+
+# --- HTTP server ----------------------------------------------------------------
+
+_FORM_PATH = re.compile(r'^/v1/forms/(?P<form_id>[^/:]+)(?P<action>:batchUpdate)?$')
+_RESPONSES_PATH = re.compile(r'^/v1/forms/(?P<form_id>[^/:]+)/responses$')
+_BATCH_PATH = '/batch'
+
+def _route(backend, method, path, body_text):
+    """Runs one REST call against the backend; errors and unknown endpoints raise FakeApiError."""
+    url = urlsplit(path)
+    path = url.path
+    match = _FORM_PATH.match(path)
+    try:
+        if method == 'POST' and path == '/v1/forms':
+            return backend.create(json.loads(body_text or '{}'))
+        if method == 'POST' and match and match.group('action'):
+            return backend.batch_update(match.group('form_id'), body_text or '{}')
+    except ValueError as e:
+        raise FakeApiError(400, f"Invalid JSON payload: {e}")
+    if method == 'GET' and match and not match.group('action'):
+        return backend.get(match.group('form_id'))
+    responses_match = _RESPONSES_PATH.match(path)
+    if method == 'GET' and responses_match:
+        query = {name: values[0] for name, values in parse_qs(url.query).items()}
+        return backend.list_responses(responses_match.group('form_id'), query.get('pageSize'), query.get('pageToken'))
+    raise FakeApiError(404, f"Unknown endpoint {method} {path}")
+
+def _parse_batch_part(payload):
+    """Splits one application/http part of a batch request into (method, path, body_text)."""
+    head, _, body_text = payload.replace('\r\n', '\n').partition('\n\n') # JSON bodies have no raw newlines
+    method, path = head.split('\n', 1)[0].split()[:2]
+    return method, path, body_text
+
+class _FakeFormsHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1' # Keep-alive, so connection reuse can be measured
+    disable_nagle_algorithm = True # Headers and body are separate writes; avoid the delayed-ACK stall
+
+    def setup(self):
+        super().setup()
+        with self.server.stats_lock:
+            self.server.connections += 1
+        if self.server.handshake_ms:
+            time.sleep(self.server.handshake_ms / 1000) # Stands in for a TLS handshake on each new connection
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _reply(self, status, payload, headers=None, content_type='application/json; charset=UTF-8'):
+        data = payload if isinstance(payload, bytes) else json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length).decode('utf-8') if length else ''
+
+    def _dispatch(self, call):
+        with self.server.stats_lock:
+            self.server.requests += 1
+        try:
+            self._reply(200, call())
+        except FakeApiError as e:
+            headers = {'Retry-After': str(e.retry_after)} if e.retry_after is not None else None
+            self._reply(e.status, e.body(), headers)
+
+    def _batch(self, body_text):
+        """Answers a multipart/mixed batch request the way the Google batch endpoint does."""
+        from email.parser import Parser
+        message = Parser().parsestr(f"Content-Type: {self.headers.get('Content-Type', '')}\r\n\r\n{body_text}")
+        if not message.is_multipart():
+            self._reply(400, FakeApiError(400, "Batch requests must be multipart/mixed").body())
+            return
+        content_ids, calls = [], []
+        for part in message.get_payload():
+            method, path, part_body = _parse_batch_part(part.get_payload())
+            content_ids.append(part.get('Content-ID', '').strip('<>'))
+            calls.append(functools.partial(_route, self.server.backend, method, path, part_body))
+        boundary = f"batch_{uuid.uuid4().hex}"
+        pieces = []
+        for content_id, (response, error) in zip(content_ids, self.server.backend.run_batch(calls)):
+            status = error.status if error else 200
+            payload = error.body().decode('utf-8') if error else json.dumps(response)
+            retry_after = f"Retry-After: {error.retry_after}\r\n" if error and error.retry_after is not None else ""
+            pieces.append(f"--{boundary}\r\nContent-Type: application/http\r\nContent-ID: <response-{content_id}>\r\n\r\n"
+                          f"HTTP/1.1 {status} {self.responses.get(status, ('',))[0]}\r\n"
+                          f"Content-Type: application/json; charset=UTF-8\r\n{retry_after}\r\n{payload}\r\n")
+        pieces.append(f"--{boundary}--\r\n")
+        self._reply(200, ''.join(pieces).encode('utf-8'), content_type=f"multipart/mixed; boundary={boundary}")
+
+    def do_POST(self):
+        body_text = self._read_body()
+        if urlsplit(self.path).path == _BATCH_PATH:
+            with self.server.stats_lock:
+                self.server.requests += 1
+            self._batch(body_text)
+            return
+        self._dispatch(lambda: _route(self.server.backend, 'POST', self.path, body_text))
+
+    def do_GET(self):
+        self._dispatch(lambda: _route(self.server.backend, 'GET', self.path, ''))
+
+class FakeFormsHTTPServer(ThreadingHTTPServer):
+    """
+    Serves a FakeFormsBackend over HTTP and counts connections and requests.
+    handshake_ms delays the first response on every new connection.
+    """
+    daemon_threads = True
+
+    def __init__(self, backend=None, host='127.0.0.1', port=DEFAULT_PORT, verbose=False, handshake_ms=0.0):
+        super().__init__((host, port), _FakeFormsHandler)
+        self.backend = backend or FakeFormsBackend()
+        self.verbose = verbose
+        self.handshake_ms = handshake_ms
+        self.connections = 0
+        self.requests = 0
+        self.stats_lock = threading.Lock()
+
+    @property
+    def api_endpoint(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start_in_background(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run an offline fake of the Google Forms v1 API.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of calls failing with 429/503")
+    parser.add_argument('--max-body-bytes', type=int, help="reject larger batchUpdate bodies with a 400")
+    parser.add_argument('--max-requests-per-batch', type=int, help="reject batchUpdates with more requests")
+    parser.add_argument('--latency-per-request-ms', type=float, default=0.0,
+                        help="extra latency per request in a batchUpdate")
+    parser.add_argument('--handshake-ms', type=float, default=0.0, help="extra delay on every new connection")
+    parser.add_argument('--verbose', action='store_true', help="log every request")
+    args = parser.parse_args(argv)
+
+    backend = FakeFormsBackend(args.latency_ms, args.jitter_ms, args.error_rate,
+                               max_body_bytes=args.max_body_bytes, max_requests_per_batch=args.max_requests_per_batch,
+                               latency_per_request_ms=args.latency_per_request_ms)
+    server = FakeFormsHTTPServer(backend, args.host, args.port, args.verbose, args.handshake_ms)
+    print(f"Fake Forms API listening on {server.api_endpoint} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\nStopped after {server.requests} requests over {server.connections} connections.")
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,373 @@
+import io
+import os
+import sys
+import json
+import argparse
+import contextlib
+import statistics
+import subprocess
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+# Benchmarks for the quiz creator scripts. Each run happens in a fresh
+# interpreter so that import costs are measured the way a user pays them.
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS = {
+    "form_creator": os.path.join(SCRIPT_DIR, 'Form_creator_code.py'),
+    "termux": os.path.join(SCRIPT_DIR, 'Termux_Quiz_Creator_V2.0.py'),
+}
+
+# Loads a script as a module (its __main__ block does not run), then optionally
+# builds the service and prepares the first request without sending it.
+_STARTUP_PROBE = '''
+import time, json, importlib.util
+started = time.perf_counter()
+spec = importlib.util.spec_from_file_location("probe_target", {path!r})
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+imported = time.perf_counter()
+first_request = None
+if {first_request!r}:
+    from google.auth.credentials import AnonymousCredentials
+    service = module._build_service(AnonymousCredentials())
+    service.forms().create(body={{"info": {{"title": "probe"}}}})
+    first_request = time.perf_counter() - started
+print(json.dumps({{"import": imported - started, "first_request": first_request}}))
+'''
+
+def _run_probe(code):
+    """Runs code in a fresh interpreter and returns (wall_seconds, parsed JSON output)."""
+    started = time.perf_counter()
+    completed = subprocess.run([sys.executable, '-c', code], cwd=SCRIPT_DIR,
+                               capture_output=True, text=True)
+    wall = time.perf_counter() - started
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr else "probe failed")
+    last_line = completed.stdout.strip().splitlines()[-1] if completed.stdout.strip() else 'null'
+    return wall, json.loads(last_line)
+
+def _summary(samples):
+    samples = [sample for sample in samples if sample is not None]
+    if not samples:
+        return None
+    return {"median_ms": round(statistics.median(samples) * 1000, 1), "min_ms": round(min(samples) * 1000, 1)}
+
+def benchmark_startup(runs, first_request=True):
+    """
+    Measures interpreter start, script import time and time-to-first-request
+    (service built from the cached discovery document, first request prepared).
+    Run the scripts once online beforehand so the discovery cache exists.
+    """
+    results = {}
+    baseline = [_run_probe('pass')[0] for _ in range(runs)]
+    results["interpreter"] = {"process": _summary(baseline)}
+    for name, path in SCRIPTS.items():
+        process, imports, first = [], [], []
+        for _ in range(runs):
+            wall, measured = _run_probe(_STARTUP_PROBE.format(path=path, first_request=first_request))
+            process.append(wall)
+            imports.append(measured["import"])
+            first.append(measured["first_request"])
+        results[name] = {"process": _summary(process), "import": _summary(imports),
+                         "first_request": _summary(first)}
+    return results
+
+def _synthetic_rows(count):
+    """Yields (text, options, correct_index, points) rows with freshly built strings."""
+    for number in range(count):
+        options = [f"Option {letter} for question {number}" for letter in "ABCD"]
+        yield (f"Question {number}: which option is right?", options, number % 4, 1 + number % 5)
+
+def _legacy_question_request(question, index):
+    """The nested createItem dict built per question before the template path existed."""
+    question_text, options_list, correct_option_index, points_value = question
+    return {"createItem": {"item": {"title": question_text, "questionItem": {"question": {
+        "required": True,
+        "choiceQuestion": {"type": "RADIO", "options": [{"value": option_text} for option_text in options_list],
+                           "shuffle": True},
+        "grading": {"pointValue": points_value,
+                    "correctAnswers": {"answers": [{"value": options_list[correct_option_index]}]}}}}},
+        "location": {"index": index}}}
+
+def _measure(function):
+    """Returns (seconds, peak_traced_bytes, result) for one call."""
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+def benchmark_payload(count):
+    """
+    Compares the old tuple + nested-dict payload path with Question objects and
+    the precompiled templates, reported per 10k questions.
+    """
+    sys.path.insert(0, SCRIPT_DIR)
+    import Form_creator_code as creator
+    per_10k = 10000 / count
+    results = {}
+
+    tuple_seconds, tuple_bytes, tuple_bank = _measure(lambda: list(_synthetic_rows(count)))
+    question_seconds, question_bytes, question_bank = _measure(
+        lambda: [creator.Question(*row) for row in _synthetic_rows(count)])
+
+    def legacy_payload():
+        requests = [_legacy_question_request(question, index) for index, question in enumerate(tuple_bank)]
+        return len(json.dumps({"requests": requests}))
+
+    def template_payload():
+        sent = 0
+        for parts, _, _ in creator._chunk_requests(question_bank):
+            body_text, _ = creator._encode_batch_body(parts, sent)
+            sent += len(parts)
+        return sent
+
+    legacy_seconds, legacy_bytes, _ = _measure(legacy_payload)
+    template_seconds, template_bytes, _ = _measure(template_payload)
+
+    results["tuples+dicts"] = {"bank": {"ms": round(tuple_seconds * per_10k * 1000, 1),
+                                        "MiB": round(tuple_bytes * per_10k / 2**20, 2)},
+                               "payload": {"ms": round(legacy_seconds * per_10k * 1000, 1),
+                                           "peak_MiB": round(legacy_bytes * per_10k / 2**20, 2)}}
+    results["Question+templates"] = {"bank": {"ms": round(question_seconds * per_10k * 1000, 1),
+                                              "MiB": round(question_bytes * per_10k / 2**20, 2)},
+                                     "payload": {"ms": round(template_seconds * per_10k * 1000, 1),
+                                                 "peak_MiB": round(template_bytes * per_10k / 2**20, 2)}}
+    return results
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    if not samples:
+        return {"p50_ms": None, "p99_ms": None}
+    def percentile(fraction):
+        return round(samples[min(len(samples) - 1, int(fraction * len(samples)))] * 1000, 2)
+    return {"p50_ms": percentile(0.50), "p99_ms": percentile(0.99)}
+
+TRANSPORTS = ('in-process', 'httplib2', 'pooled')
+
+def _http_service_factory(api_endpoint, transport, workers):
+    """
+    Returns (factory, close): factory builds a real client service pointed at the
+    fake HTTP server, over its own httplib2 connection or the shared PooledHttp.
+    """
+    import httplib2
+    from google.auth.credentials import AnonymousCredentials
+    from googleapiclient.discovery import build, build_from_document
+    import Form_creator_code as creator
+    document = creator.DiscoveryFileCache().load(allow_stale=True)
+    options = {"api_endpoint": api_endpoint}
+    pooled = creator.PooledHttp(AnonymousCredentials(), workers) if transport == 'pooled' else None
+    def factory():
+        http = pooled or httplib2.Http(timeout=creator.HTTP_TIMEOUT_SECONDS)
+        if document is not None:
+            return build_from_document(document, http=http, client_options=options)
+        return build('forms', 'v1', http=http, client_options=options, static_discovery=True)
+    return factory, (pooled.close if pooled else lambda: None)
+
+def _run_scenario(name, forms, questions_per_form, workers, backend_options, transport='in-process',
+                  service_per_form=False, handshake_ms=0.0, batch_size='fixed'):
+    """
+    Provisions forms quiz forms of questions_per_form questions each against a
+    fresh fake backend, with workers threads, and returns the scenario metrics.
+    Services are built once per thread, or once per form with service_per_form.
+    batch_size 'adaptive' sizes the batchUpdate chunks with AdaptiveBatchSize.
+    """
+    import Form_creator_code as creator
+    import fake_forms_api
+
+    backend = fake_forms_api.FakeFormsBackend(**backend_options)
+    server = None
+    close_transport = lambda: None
+    if transport == 'in-process':
+        new_service = lambda: fake_forms_api.FakeFormsService(backend)
+    else:
+        server = fake_forms_api.FakeFormsHTTPServer(backend, port=0, handshake_ms=handshake_ms)
+        server.start_in_background()
+        new_service, close_transport = _http_service_factory(server.api_endpoint, transport, workers)
+
+    creator.run_retry_budget = creator.RetryBudget(creator.RETRY_BUDGET_PER_RUN)
+    creator.retry_stats.update(retries=0, backoff_seconds=0.0, gave_up=0)
+    creator.run_metrics = creator.RunMetrics() # Client-side call latency, including connection setup
+    creator.batch_sizer = creator.AdaptiveBatchSize() if batch_size == 'adaptive' else None
+    local = threading.local()
+    banks = [[creator.Question(*row) for row in _synthetic_rows(questions_per_form)] for _ in range(forms)]
+
+    def provision(number):
+        if service_per_form or not hasattr(local, 'service'): # httplib2 is not thread-safe
+            local.service = new_service()
+        started = time.perf_counter()
+        _, _, quiz_ok, questions_ok = creator._provision_quiz_form(
+            local.service, f"Benchmark {name} {number}", f"benchmark_{name}_{number}", banks[number])
+        return time.perf_counter() - started, quiz_ok and questions_ok
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()): # The scripts narrate every step
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            outcomes = list(executor.map(provision, range(forms)))
+    wall = time.perf_counter() - started
+    close_transport()
+    if server is not None:
+        server.shutdown()
+        server.server_close()
+    client_latencies = [event["ms"] / 1000 for event in creator.run_metrics.events if event["event"] == "call"]
+    creator.run_metrics = None
+    sizer, creator.batch_sizer = creator.batch_sizer, None
+
+    succeeded = sum(1 for _, ok in outcomes if ok)
+    calls = backend.stats["calls"]
+    return {
+        "run": {"forms": forms, "questions_per_form": questions_per_form, "workers": workers,
+                "transport": transport + (" (service per form)" if service_per_form else ""),
+                "batch_size": batch_size},
+        "throughput": {"wall_s": round(wall, 3), "forms_per_min": round(succeeded / wall * 60, 1),
+                       "questions_per_s": round(succeeded * questions_per_form / wall, 1),
+                       "succeeded": succeeded},
+        "calls": {"per_form": round(calls / forms, 2), "total": calls,
+                  "errors_injected": backend.stats["errors_injected"], "retries": creator.retry_stats["retries"]},
+        "connections": server.connections if server is not None else None,
+        "server_call_latency": backend.latency_percentiles(),
+        "client_call_latency": _percentiles(client_latencies),
+        "form_latency": _percentiles([seconds for seconds, _ in outcomes]),
+        "batch_sizes": {"batch_updates": backend.stats["by_method"].get("batchUpdate", 0),
+                        "rejected": backend.stats["rejected"],
+                        "final_items": sizer.items if sizer else creator.MAX_ITEMS_PER_BATCH,
+                        "changes": sizer.stats["increases"] + sizer.stats["decreases"] if sizer else 0},
+    }
+
+def benchmark_e2e(args):
+    """
+    Runs the single, bulk and concurrent provisioning scenarios end to end
+    against the offline fake Forms API (fake_forms_api.py).
+    Backoff is shortened so injected errors cost retries, not long sleeps.
+    """
+    sys.path.insert(0, SCRIPT_DIR)
+    import Form_creator_code as creator
+    creator.BACKOFF_BASE_SECONDS = 0.01
+    creator.BACKOFF_MAX_SECONDS = 0.2
+    backend_options = {"latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms, "error_rate": args.error_rate,
+                       "max_body_bytes": args.max_body_bytes, "seed": args.seed,
+                       "latency_per_request_ms": args.latency_per_request_ms}
+    scenarios = {
+        "single": (1, args.questions, 1),
+        "bulk": (1, args.bulk_questions, 1),
+        "concurrent": (args.forms, args.questions, args.workers),
+    }
+    results = {}
+    for name in args.scenarios:
+        forms, questions, workers = scenarios[name]
+        results[name] = _run_scenario(name, forms, questions, workers, backend_options, args.transport,
+                                      batch_size=args.batch_size)
+    return results
+
+def benchmark_transport(args):
+    """
+    Compares connection handshakes and call latency of the HTTP transports on
+    the concurrent scenario, against the fake API served over local HTTP:
+    a new httplib2 service per form, one per worker thread, and the shared pool.
+    """
+    sys.path.insert(0, SCRIPT_DIR)
+    import Form_creator_code as creator
+    creator.BACKOFF_BASE_SECONDS = 0.01
+    creator.BACKOFF_MAX_SECONDS = 0.2
+    backend_options = {"latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms, "seed": args.seed}
+    variants = {
+        "httplib2 per form": ('httplib2', True),
+        "httplib2 per thread": ('httplib2', False),
+        "pooled": ('pooled', False),
+    }
+    return {name: _run_scenario(name, args.forms, args.questions, args.workers, backend_options, transport,
+                                service_per_form, args.handshake_ms)
+            for name, (transport, service_per_form) in variants.items()}
+
+def _git_commit():
+    """Short hash of the checked-out commit (with '+dirty' for local changes), or None outside git."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SCRIPT_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=SCRIPT_DIR,
+                               capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ('+dirty' if dirty else '')
+
+def _print_table(title, results):
+    print(f"\n--- {title} ---")
+    for name, metrics in results.items():
+        cells = []
+        for metric, summary in metrics.items():
+            if summary is None:
+                continue
+            if isinstance(summary, dict):
+                cells.append(f"{metric}: {', '.join(f'{key}={value}' for key, value in summary.items())}")
+            else:
+                cells.append(f"{metric}: {summary}")
+        print(f"{name:<20} " + " | ".join(cells))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks for the quiz creator scripts.")
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+    startup = subparsers.add_parser('startup', help="import time and time-to-first-request")
+    startup.add_argument('--runs', type=int, default=5)
+    startup.add_argument('--imports-only', action='store_true',
+                         help="skip building the service (no discovery document needed)")
+    payload = subparsers.add_parser('payload', help="memory and time per 10k questions for payload building")
+    payload.add_argument('--questions', type=int, default=100000)
+    e2e = subparsers.add_parser('e2e', help="end-to-end provisioning against the offline fake Forms API")
+    e2e.add_argument('--scenarios', nargs='+', choices=('single', 'bulk', 'concurrent'),
+                     default=['single', 'bulk', 'concurrent'])
+    e2e.add_argument('--questions', type=int, default=50, help="questions per form (single and concurrent)")
+    e2e.add_argument('--bulk-questions', type=int, default=5000, help="questions in the bulk scenario's form")
+    e2e.add_argument('--forms', type=int, default=20, help="forms in the concurrent scenario")
+    e2e.add_argument('--workers', type=int, default=4, help="threads in the concurrent scenario")
+    e2e.add_argument('--latency-ms', type=float, default=20.0, help="simulated latency of every API call")
+    e2e.add_argument('--jitter-ms', type=float, default=5.0)
+    e2e.add_argument('--error-rate', type=float, default=0.0, help="fraction of calls failing with 429/503")
+    e2e.add_argument('--max-body-bytes', type=int, help="fake server rejects larger batchUpdate bodies")
+    e2e.add_argument('--latency-per-request-ms', type=float, default=0.0,
+                     help="extra simulated latency per request in a batchUpdate")
+    e2e.add_argument('--batch-size', choices=('adaptive', 'fixed'), default='adaptive',
+                     help="batchUpdate sizing: AIMD-adapted (the script's default) or fixed")
+    e2e.add_argument('--seed', type=int, default=1, help="seed for latency jitter and error injection")
+    e2e.add_argument('--transport', choices=TRANSPORTS, default='in-process',
+                     help="call the fake in-process, or through the client library and a local HTTP server")
+    transport = subparsers.add_parser('transport', help="connection handshakes and latency per HTTP transport")
+    transport.add_argument('--forms', type=int, default=40)
+    transport.add_argument('--questions', type=int, default=20, help="questions per form")
+    transport.add_argument('--workers', type=int, default=4)
+    transport.add_argument('--latency-ms', type=float, default=5.0, help="simulated latency of every API call")
+    transport.add_argument('--jitter-ms', type=float, default=1.0)
+    transport.add_argument('--handshake-ms', type=float, default=30.0,
+                           help="simulated TLS handshake cost of every new connection")
+    transport.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json-out', metavar='FILE', help="also write the results as JSON")
+    args = parser.parse_args(argv)
+
+    if args.benchmark == 'startup':
+        results = benchmark_startup(args.runs, first_request=not args.imports_only)
+        _print_table("Startup", results)
+    elif args.benchmark == 'payload':
+        results = benchmark_payload(args.questions)
+        _print_table(f"Payload building per 10k questions ({args.questions} built)", results)
+    elif args.benchmark == 'e2e':
+        results = benchmark_e2e(args)
+        _print_table(f"End to end against the fake API ({args.latency_ms:g}ms latency, "
+                     f"{args.error_rate:.0%} errors)", results)
+    elif args.benchmark == 'transport':
+        results = benchmark_transport(args)
+        _print_table(f"HTTP transports ({args.handshake_ms:g}ms handshake, {args.latency_ms:g}ms latency)", results)
+
+    if args.json_out:
+        with open(args.json_out, 'w', encoding='utf-8') as json_file:
+            json.dump({"benchmark": args.benchmark, "time": time.time(), "commit": _git_commit(),
+                       "python": sys.version.split()[0], "options": vars(args), "results": results},
+                      json_file, indent=2)
+        print(f"Results written to {args.json_out}")
+
+
+if __name__ == '__main__':
+    main()
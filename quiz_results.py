@@ -0,0 +1,304 @@
+import csv
+import json
+import argparse
+import Form_creator_code as creator
+
+# Reads back the responses of a quiz made with Form_creator_code.py. Responses
+# are paged through as a stream and written to CSV (or a columnar .npz) as
+# they arrive, and item statistics are computed over a compact response
+# matrix: difficulty, discrimination, option selection rates and the score
+# distribution. The statistics and .npz export need numpy; CSV export does not.
+
+RESPONSES_PAGE_SIZE = 5000 # Largest page responses.list returns
+UNANSWERED = -1 # Selection codes in the response matrix
+OTHER_ANSWER = -2 # An answer matching none of the current options (e.g. edited since)
+UPPER_LOWER_FRACTION = 0.27 # Share of respondents in each group of the upper-lower discrimination index
+HISTOGRAM_MAX_BINS = 20
+
+def _graded_questions(form):
+    """Returns the form's graded choice questions as dicts (question_id, title, options, correct_index, points)."""
+    questions = []
+    for item in form.get('items', []):
+        question = item.get('questionItem', {}).get('question', {})
+        choice = question.get('choiceQuestion')
+        grading = question.get('grading')
+        if not choice or not grading:
+            continue
+        options = [option.get('value', '') for option in choice.get('options', [])]
+        correct_values = {answer.get('value') for answer in grading.get('correctAnswers', {}).get('answers', [])}
+        correct = [index for index, option in enumerate(options) if option in correct_values]
+        questions.append({"question_id": question['questionId'], "title": item.get('title', ''),
+                          "options": options, "correct_index": correct[0] if correct else None,
+                          "points": grading.get('pointValue', 0)})
+    return questions
+
+def iter_response_pages(service, form_id, page_size=RESPONSES_PAGE_SIZE, since=None):
+    """Yields the form's responses one API page (a list) at a time, so only one page is held in memory."""
+    page_token = None
+    while True:
+        list_args = {"formId": form_id, "pageSize": page_size}
+        if page_token:
+            list_args["pageToken"] = page_token
+        if since:
+            list_args["filter"] = f"timestamp >= {since}"
+        page = creator._execute(service.forms().responses().list(**list_args))
+        yield page.get('responses', [])
+        page_token = page.get('nextPageToken')
+        if not page_token:
+            return
+
+def _answer_values(answer):
+    return [text.get('value', '') for text in answer.get('textAnswers', {}).get('answers', [])]
+
+def _first_answer_value(answer):
+    """The first selected value of an answer, or None if the question was left unanswered."""
+    if answer is None:
+        return None
+    texts = answer.get('textAnswers', {}).get('answers')
+    return texts[0].get('value') if texts else None
+
+def _encode_page(responses, questions, option_codes):
+    """
+    Turns a page of responses into (selection_rows, scores): per response, the
+    option index chosen for each question (UNANSWERED / OTHER_ANSWER) and the
+    total score (None when the API gave none).
+    """
+    question_ids = [question['question_id'] for question in questions]
+    selection_rows = []
+    scores = []
+    for response in responses:
+        values = map(_first_answer_value, map(response.get('answers', {}).get, question_ids))
+        selection_rows.append([UNANSWERED if value is None else codes.get(value, OTHER_ANSWER)
+                               for value, codes in zip(values, option_codes)])
+        scores.append(response.get('totalScore'))
+    return selection_rows, scores
+
+class ResponseMatrix:
+    """
+    The responses reduced to what the statistics need: an int16 option code per
+    question and response, and the total scores, kept as numpy arrays per page.
+    """
+    def __init__(self, question_count):
+        import numpy
+        self.numpy = numpy
+        self.question_count = question_count
+        self.selection_pages = []
+        self.score_pages = []
+
+    def add(self, selection_rows, scores):
+        numpy = self.numpy
+        self.selection_pages.append(numpy.array(selection_rows, dtype=numpy.int16).reshape(-1, self.question_count))
+        self.score_pages.append(numpy.array([numpy.nan if score is None else score for score in scores],
+                                            dtype=numpy.float64))
+
+    def arrays(self):
+        """Returns (selections, scores) as single arrays."""
+        numpy = self.numpy
+        if not self.selection_pages:
+            return numpy.zeros((0, self.question_count), dtype=numpy.int16), numpy.zeros(0)
+        return numpy.concatenate(self.selection_pages), numpy.concatenate(self.score_pages)
+
+def compute_statistics(selections, api_scores, questions):
+    """
+    Item analysis over the response matrix, vectorized over all responses and questions:
+    difficulty (share answering correctly), discrimination (point-biserial correlation
+    of each item with the rest of the score, and the upper-lower 27% index), option
+    selection and omission rates, and the total score distribution.
+    """
+    import numpy
+    count, question_count = selections.shape
+    max_options = max((len(question['options']) for question in questions), default=0)
+    correct_index = numpy.array([question['correct_index'] if question['correct_index'] is not None else -99
+                                 for question in questions], dtype=numpy.int16)
+    points = numpy.array([question['points'] for question in questions], dtype=numpy.float32)
+
+    correct = selections == correct_index # count x questions
+    correct_float = correct.astype(numpy.float32)
+    item_scores = correct_float * points
+    totals = item_scores.sum(axis=1)
+    difficulty = correct_float.mean(axis=0) if count else numpy.full(question_count, numpy.nan)
+
+    rest = totals[:, None] - item_scores # Item excluded, so it does not correlate with itself
+    item_centered = correct_float - correct_float.mean(axis=0)
+    rest_centered = rest - rest.mean(axis=0)
+    denominator = numpy.sqrt((item_centered ** 2).sum(axis=0) * (rest_centered ** 2).sum(axis=0))
+    with numpy.errstate(invalid='ignore', divide='ignore'):
+        discrimination = numpy.where(denominator > 0, (item_centered * rest_centered).sum(axis=0) / denominator,
+                                     numpy.nan)
+
+    group_size = max(1, int(round(count * UPPER_LOWER_FRACTION)))
+    order = numpy.argsort(totals, kind='stable')
+    if count:
+        upper_lower = correct_float[order[-group_size:]].mean(axis=0) - correct_float[order[:group_size]].mean(axis=0)
+    else:
+        upper_lower = numpy.full(question_count, numpy.nan)
+
+    # Option counts for all questions at once: bucket max_options is "unanswered", max_options + 1 "other"
+    width = max_options + 2
+    buckets = numpy.where(selections >= 0, selections,
+                          numpy.where(selections == UNANSWERED, max_options, max_options + 1))
+    flat = (numpy.arange(question_count, dtype=numpy.int64) * width + buckets).ravel()
+    option_counts = numpy.bincount(flat, minlength=question_count * width).reshape(question_count, width)
+    option_rates = option_counts / count if count else option_counts.astype(float)
+
+    scores = numpy.where(numpy.isnan(api_scores), totals, api_scores) if count else totals
+    distribution = {"responses": int(count)}
+    if count:
+        percentiles = numpy.percentile(scores, [10, 25, 50, 75, 90])
+        bins = int(min(HISTOGRAM_MAX_BINS, max(1, scores.max() - scores.min() + 1)))
+        histogram, edges = numpy.histogram(scores, bins=bins)
+        distribution.update(mean=round(float(scores.mean()), 3), std=round(float(scores.std()), 3),
+                            min=float(scores.min()), max=float(scores.max()), max_possible=float(points.sum()),
+                            percentiles={f"p{p}": round(float(v), 3) for p, v in zip((10, 25, 50, 75, 90), percentiles)},
+                            histogram={"counts": histogram.tolist(), "edges": [round(float(e), 3) for e in edges]})
+
+    items = []
+    for position, question in enumerate(questions):
+        items.append({"question": question['title'], "question_id": question['question_id'],
+                      "points": question['points'],
+                      "difficulty": _rounded(difficulty[position]),
+                      "discrimination": _rounded(discrimination[position]),
+                      "upper_lower": _rounded(upper_lower[position]),
+                      "omitted": _rounded(option_rates[position, max_options]),
+                      "other": _rounded(option_rates[position, max_options + 1]),
+                      "options": [{"value": option, "rate": _rounded(option_rates[position, index]),
+                                   "correct": index == question['correct_index']}
+                                  for index, option in enumerate(question['options'])]})
+    return {"scores": distribution, "items": items}
+
+def _rounded(value):
+    value = float(value)
+    return None if value != value else round(value, 4) # NaN -> None, for JSON
+
+class _CsvExport:
+    """Writes one CSV row per response as pages arrive: ids, score, then the answer to each question."""
+    def __init__(self, path, questions):
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.questions = questions
+        self.writer.writerow(['response_id', 'submitted', 'total_score'] + [question['title'] for question in questions])
+
+    def add_page(self, responses):
+        question_ids = [question['question_id'] for question in self.questions]
+        join = creator.CSV_OPTION_SEPARATOR.join
+        self.writer.writerows(
+            [response.get('responseId'), response.get('lastSubmittedTime'), response.get('totalScore', '')]
+            + ['' if answer is None else join(_answer_values(answer))
+               for answer in map(response.get('answers', {}).get, question_ids)]
+            for response in responses)
+
+    def close(self):
+        self.file.close()
+
+def _print_report(statistics):
+    scores = statistics["scores"]
+    print(f"\n--- Scores ({scores['responses']} responses) ---")
+    if not scores['responses']:
+        return
+    print(f"Mean {scores['mean']} (sd {scores['std']}), median {scores['percentiles']['p50']}, "
+          f"range {scores['min']:g}-{scores['max']:g} of {scores['max_possible']:g}")
+    counts, edges = scores['histogram']['counts'], scores['histogram']['edges']
+    largest = max(counts) or 1
+    for number, bin_count in enumerate(counts):
+        print(f"  {edges[number]:>7g}-{edges[number + 1]:<7g} {'#' * round(40 * bin_count / largest)} {bin_count}")
+
+    print("\n--- Items (difficulty = share correct; discrimination = item-rest correlation) ---")
+    print(f"{'#':>3} {'difficulty':>10} {'discrim.':>9} {'upper-low':>9} {'omitted':>8}  options (* = correct)")
+    for number, item in enumerate(statistics["items"], start=1):
+        options = " | ".join(f"{chr(65 + index) if index < 26 else index}{'*' if option['correct'] else ''} "
+                             f"{option['rate'] * 100:.0f}%" for index, option in enumerate(item['options']))
+        print(f"{number:>3} {_cell(item['difficulty']):>10} {_cell(item['discrimination']):>9} "
+              f"{_cell(item['upper_lower']):>9} {_cell(item['omitted'], percent=True):>8}  {options}")
+
+def _cell(value, percent=False):
+    if value is None:
+        return "-"
+    return f"{value * 100:.0f}%" if percent else f"{value:.2f}"
+
+def results_logic(args):
+    """Reads a quiz's responses, exports them and prints (or saves) the item statistics."""
+    try:
+        import numpy
+    except ImportError:
+        numpy = None
+        print("numpy is not installed: responses can be exported, but no statistics are computed (pip install numpy).")
+        if not args.export or args.export.endswith('.npz'):
+            return
+
+    creds = creator.authenticate(scopes=creator.SCOPES + [creator.RESPONSES_SCOPE])
+    if not creds:
+        print("Exiting script due to authentication failure.")
+        return
+    service = creator._build_service(creds)
+    if service is None:
+        return
+    try:
+        form = creator._execute(service.forms().get(formId=args.form_id))
+    except creator.HttpError as e:
+        print(f"Error reading form '{args.form_id}': {e}")
+        return
+    questions = _graded_questions(form)
+    if not questions:
+        print(f"Form '{args.form_id}' has no graded choice questions.")
+        return
+    option_codes = [{option: index for index, option in enumerate(question['options'])} for question in questions]
+
+    csv_export = _CsvExport(args.export, questions) if args.export and not args.export.endswith('.npz') else None
+    matrix = ResponseMatrix(len(questions)) if numpy else None
+    total = 0
+    try:
+        for page in iter_response_pages(service, args.form_id, args.page_size, args.since):
+            if csv_export:
+                csv_export.add_page(page)
+            if matrix:
+                matrix.add(*_encode_page(page, questions, option_codes))
+            total += len(page)
+            print(f"Read {total} responses...")
+    except creator.HttpError as e:
+        print(f"Error reading responses of form '{args.form_id}': {e}")
+        return
+    finally:
+        if csv_export:
+            csv_export.close()
+    if csv_export:
+        print(f"Responses written to {args.export}")
+    if not matrix:
+        return
+    if not total:
+        print(f"Form '{args.form_id}' has no responses yet.")
+        return
+
+    selections, scores = matrix.arrays()
+    if args.export and args.export.endswith('.npz'):
+        numpy.savez_compressed(args.export, selections=selections, scores=scores,
+                               question_ids=numpy.array([question['question_id'] for question in questions]))
+        print(f"Response matrix written to {args.export}")
+    statistics = compute_statistics(selections, scores, questions)
+    _print_report(statistics)
+    if args.stats_out:
+        with open(args.stats_out, 'w', encoding='utf-8') as stats_file:
+            json.dump(statistics, stats_file, indent=2)
+        print(f"Statistics written to {args.stats_out}")
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Export the responses of a quiz and analyse its questions.")
+    parser.add_argument('form_id', help="ID of the quiz form")
+    parser.add_argument('--export', metavar='FILE',
+                        help="write every response to FILE: CSV, or a columnar numpy matrix if FILE ends in .npz")
+    parser.add_argument('--stats-out', metavar='FILE', help="also write the statistics as JSON")
+    parser.add_argument('--since', metavar='TIMESTAMP',
+                        help="only responses submitted at or after this RFC3339 time, e.g. 2024-05-01T00:00:00Z")
+    parser.add_argument('--page-size', type=int, default=RESPONSES_PAGE_SIZE,
+                        help=f"responses per API call (default and maximum: {RESPONSES_PAGE_SIZE})")
+    parser.add_argument('--offline', action='store_true',
+                        help="build the API client from the cached or bundled discovery document without fetching it")
+    args = parser.parse_args(argv)
+    if not 1 <= args.page_size <= RESPONSES_PAGE_SIZE:
+        parser.error(f"--page-size must be between 1 and {RESPONSES_PAGE_SIZE}")
+    return args
+
+
+if __name__ == '__main__':
+    cli_args = _parse_args()
+    creator.offline_mode = cli_args.offline
+    results_logic(cli_args)